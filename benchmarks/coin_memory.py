@@ -0,0 +1,90 @@
+import argparse
+import gc
+import multiprocessing
+import sys
+import tracemalloc
+
+import emoji
+
+from crypto_bot.price_indexer import Coin
+from crypto_bot.ticker_store import TickerStore
+
+
+class LegacyCoin:
+
+    def __init__(self, id, symbol, name=None, exchange=None):
+        self.coin_id = id
+        self.symbol = symbol.lower()
+        self.name = name
+        self.price = 0
+        self.perc = 0
+        self.direction = ""
+        self.last_exchange = exchange
+        self.info = {}
+
+    def update(self, price, perc, exchange=None):
+        self.price = float(price)
+        try:
+            self.perc = round(float(perc), 2)
+            self.direction = emoji.emojize(
+                ":green_circle:" if self.perc >= 0 else ":red_circle:", use_aliases=True)
+        except ValueError:
+            self.perc = perc or "N/A"
+        if exchange:
+            self.last_exchange = exchange
+
+
+def listing(count):
+    return [("coin-{}".format(i), "SYM{}".format(i), "Coin {}".format(i)) for i in range(count)]
+
+
+def measure(build, count):
+    # warm up first so one-off allocations (emoji tables, interpreter caches) are not counted
+    build(listing(100))
+    entries = listing(count)
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    coins = build(entries)
+    for i, c in enumerate(coins.values()):
+        c.update(str(i * 1.5), str(i % 7 - 3.5), exchange="CoinGecko")
+    gc.collect()
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return used / count
+
+
+def build_legacy(entries):
+    coins = {}
+    for cid, s, n in entries:
+        s = s.lower()
+        coins[s] = LegacyCoin(cid, s, n, exchange="CoinGecko")
+    return coins
+
+
+def build_current(entries):
+    store = TickerStore()
+    coins = {}
+    for cid, s, n in entries:
+        s = sys.intern(s.lower())
+        coins[s] = Coin(cid, s, n, exchange="CoinGecko", store=store)
+    return coins
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-coin memory of legacy vs slotted Coin")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 5000, 10000, 15000, 20000, 50000])
+    args = parser.parse_args()
+
+    # every run gets a fresh process so sizes do not share the intern table or freed arenas
+    ctx = multiprocessing.get_context('spawn')
+    print("{:>8} {:>12} {:>12} {:>8}".format("coins", "legacy B", "slotted B", "saved"))
+    for count in args.sizes:
+        with ctx.Pool(1, maxtasksperchild=1) as pool:
+            legacy = pool.apply(measure, (build_legacy, count))
+            current = pool.apply(measure, (build_current, count))
+        print("{:8d} {:12.1f} {:12.1f} {:7.1f}%".format(count, legacy, current, (1 - current / legacy) * 100))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,155 @@
+import argparse
+import asyncio
+import json
+import logging
+import random
+import threading
+
+from aiohttp import web
+
+
+class FakeExchangeServer:
+
+    def __init__(self, pairs=1000, latency=0.0, jitter=0.0, error_rate=0.0, host="127.0.0.1", port=0, seed=1):
+        self.pairs = pairs
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.host = host
+        self.port = port
+        self.random = random.Random(seed)
+        self.logger = logging.getLogger("fake exchanges")
+        self.requests = 0
+        self.errors = 0
+        self.runner = None
+        self.loop = None
+        self.thread = None
+        self.prices = [round(self.random.uniform(0.0001, 50000), 6) for _ in range(pairs)]
+        self.percs = [round(self.random.uniform(-30, 30), 2) for _ in range(pairs)]
+        self.bodies = self.build_bodies()
+
+    @property
+    def url(self):
+        return "http://{}:{}".format(self.host, self.port)
+
+    def symbol(self, i):
+        return "c{}".format(i)
+
+    def build_bodies(self):
+        # CoinGecko lists every coin, KuCoin the first half and Binance US the first quarter,
+        # so tracked symbols spread across all three routes
+        coins = [{'id': "coin-{}".format(i), 'symbol': self.symbol(i), 'name': "Coin {}".format(i)}
+                 for i in range(self.pairs)]
+        kucoin = {'code': '200000', 'data': {'time': 0, 'ticker': [
+            {'symbol': "{}-USDT".format(self.symbol(i).upper()), 'last': str(self.prices[i]),
+             'changeRate': str(self.percs[i] / 100)} for i in range(self.pairs // 2)]}}
+        binance = [{'symbol': "{}USD".format(self.symbol(i).upper()), 'lastPrice': str(self.prices[i]),
+                    'priceChangePercent': str(self.percs[i])} for i in range(self.pairs // 4)]
+        return {
+            'coingecko': json.dumps(coins).encode(),
+            'kucoin': json.dumps(kucoin).encode(),
+            'binance_us': json.dumps(binance).encode(),
+        }
+
+    def app(self):
+        app = web.Application(middlewares=[self.inject])
+        app.router.add_get('/coingecko/coins/list', self.body_handler('coingecko'))
+        app.router.add_get('/coingecko/simple/price', self.simple_price)
+        app.router.add_get('/kucoin/api/v1/market/allTickers', self.body_handler('kucoin'))
+        app.router.add_get('/binance_us/api/v3/ticker/24hr', self.body_handler('binance_us'))
+        return app
+
+    @web.middleware
+    async def inject(self, request, handler):
+        self.requests += 1
+        delay = self.latency + self.random.uniform(0, self.jitter)
+        if delay:
+            await asyncio.sleep(delay)
+        if self.error_rate and self.random.random() < self.error_rate:
+            self.errors += 1
+            raise web.HTTPInternalServerError(text="injected error")
+        return await handler(request)
+
+    def body_handler(self, exchange):
+        async def handler(request):
+            return web.Response(body=self.bodies[exchange], content_type="application/json")
+        return handler
+
+    async def simple_price(self, request):
+        prices = {}
+        for cid in request.query.get('ids', '').split(','):
+            try:
+                i = int(cid.rsplit('-', 1)[1])
+                prices[cid] = {'usd': self.prices[i], 'usd_24h_change': self.percs[i]}
+            except (IndexError, ValueError):
+                continue
+        return web.json_response(prices)
+
+    async def start(self):
+        self.runner = web.AppRunner(self.app(), access_log=None)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, self.host, self.port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+        self.logger.info("Fake exchanges with {} pairs listening on {}".format(self.pairs, self.url))
+
+    async def stop(self):
+        if self.runner:
+            await self.runner.cleanup()
+
+    def start_in_thread(self):
+        self.loop = asyncio.new_event_loop()
+        ready = threading.Event()
+
+        def run():
+            asyncio.set_event_loop(self.loop)
+            self.loop.run_until_complete(self.start())
+            ready.set()
+            self.loop.run_forever()
+
+        self.thread = threading.Thread(target=run, name="fake exchanges", daemon=True)
+        self.thread.start()
+        ready.wait()
+        return self
+
+    def stop_thread(self):
+        if self.loop:
+            asyncio.run_coroutine_threadsafe(self.stop(), self.loop).result()
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.thread.join()
+
+    def exchange_configs(self, **overrides):
+        configs = {
+            'kucoin': {'priority': 1, 'update_rate': 5, 'base_url': self.url + "/kucoin"},
+            'binance_us': {'priority': 2, 'update_rate': 5, 'base_url': self.url + "/binance_us"},
+            'coingecko': {'priority': 3, 'update_rate': 650, 'base_url': self.url + "/coingecko",
+                          'rate_limit': {'requests_per_minute': 600000, 'burst': 1000}},
+        }
+        for name, cfg in overrides.items():
+            configs[name].update(cfg)
+        return configs
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve fake CoinGecko, KuCoin and Binance US endpoints")
+    parser.add_argument('--pairs', type=int, default=1000)
+    parser.add_argument('--latency', type=float, default=0.0)
+    parser.add_argument('--jitter', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--port', type=int, default=8766)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    server = FakeExchangeServer(args.pairs, args.latency, args.jitter, args.error_rate, port=args.port)
+    loop = asyncio.get_event_loop()
+    loop.run_until_complete(server.start())
+    try:
+        loop.run_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        loop.run_until_complete(server.stop())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,239 @@
+import argparse
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import queue
+import resource
+import subprocess
+import tempfile
+import threading
+import time
+import tracemalloc
+from datetime import datetime
+
+from benchmarks.fake_exchanges import FakeExchangeServer
+from crypto_bot._version import __version__
+from crypto_bot.exchanges import Exchange
+from crypto_bot.http_client import close_all_async
+from crypto_bot.price_indexer import PriceIndexer
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+RESULTS_DIR = os.path.join(BENCH_DIR, "results")
+
+
+def percentile(values, p):
+    values = sorted(values)
+    if not values:
+        return 0
+    k = (len(values) - 1) * p / 100
+    lo = int(k)
+    hi = min(lo + 1, len(values) - 1)
+    return values[lo] + (values[hi] - values[lo]) * (k - lo)
+
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], stderr=subprocess.DEVNULL,
+                                       cwd=BENCH_DIR).decode().strip()
+    except Exception:
+        return None
+
+
+def start_loop():
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, name="bench loop", daemon=True).start()
+    return loop
+
+
+def fetch_listing(exchange, loop, attempts=10):
+    start = time.monotonic()
+    for i in range(attempts):
+        try:
+            asyncio.run_coroutine_threadsafe(exchange.get_coins(), loop).result()
+            break
+        except Exception as e:
+            if i == attempts - 1:
+                raise
+            logging.getLogger("bench").warning("{} listing failed, retrying: {}".format(exchange.name, e))
+    exchange.coins_ready()
+    return {'seconds': round(time.monotonic() - start, 4), 'coins': len(exchange.coins)}
+
+
+def run_ticks(indexer, ticks):
+    durations = []
+    for _ in range(ticks):
+        start = time.monotonic()
+        indexer.update_coins(wait=True)
+        durations.append(time.monotonic() - start)
+    return durations
+
+
+def measure_allocations(indexer, ticks):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    peaks = []
+    for _ in range(ticks):
+        tracemalloc.reset_peak()
+        start = tracemalloc.get_traced_memory()[0]
+        indexer.update_coins(wait=True)
+        peaks.append(tracemalloc.get_traced_memory()[1] - start)
+    retained = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return {
+        'peak_bytes_per_tick': int(sum(peaks) / len(peaks)),
+        'retained_bytes_per_tick': int(retained / ticks),
+    }
+
+
+def run_scenario(args, pairs):
+    server = FakeExchangeServer(pairs, args.latency, args.jitter, args.error_rate).start_in_thread()
+    icons = tempfile.mkdtemp(prefix="bench-icons-")
+    configs = server.exchange_configs(coingecko={'icon_cache': {'path': icons}})
+    exchanges = [Exchange.create(name, configs[name]) for name in args.exchanges]
+    loop = start_loop()
+
+    listing = {e.name: fetch_listing(e, loop) for e in exchanges}
+    indexer = PriceIndexer(exchanges, args.update_rate, snapshot={'enabled': False})
+    step = max(1, pairs // args.tracked)
+    tracked = [server.symbol(i) for i in range(0, pairs, step)][:args.tracked]
+    for s in tracked:
+        indexer.add_new_coin(s)
+    for e in exchanges:
+        e.update_rate = args.poll_rate
+        loop.call_soon_threadsafe(e.start, loop)
+
+    run_ticks(indexer, args.warmup)
+    durations = run_ticks(indexer, args.ticks)
+    allocations = measure_allocations(indexer, args.alloc_ticks) if args.alloc_ticks else {}
+    routes = {}
+    for symbol in tracked:
+        route = indexer.get_route(symbol)
+        if route:
+            routes[route[0]] = routes.get(route[0], 0) + 1
+
+    indexer.stop()
+    for e in exchanges:
+        loop.call_soon_threadsafe(e.stop)
+    asyncio.run_coroutine_threadsafe(close_all_async(), loop).result()
+    server.stop_thread()
+
+    total = sum(durations)
+    return {
+        'pairs': pairs,
+        'tracked': len(tracked),
+        'routes': routes,
+        'listing': listing,
+        'ticks': {
+            'count': len(durations),
+            'p50_ms': round(percentile(durations, 50) * 1000, 3),
+            'p99_ms': round(percentile(durations, 99) * 1000, 3),
+            'mean_ms': round(total / len(durations) * 1000, 3),
+            'ticks_per_sec': round(len(durations) / total, 2),
+            'quotes_per_sec': round(len(durations) * len(tracked) / total, 1),
+        },
+        'allocations': allocations,
+        'server': {'requests': server.requests, 'errors': server.errors},
+        'peak_rss_mb': round(peak_rss_mb(), 1),
+    }
+
+
+def scenario_worker(args, pairs, results):
+    logging.basicConfig(level=logging.WARNING)
+    try:
+        results.put(run_scenario(args, pairs))
+    except Exception as e:
+        results.put({'pairs': pairs, 'error': str(e)})
+
+
+def scenario_result(p, results, pairs):
+    while True:
+        try:
+            return results.get(timeout=1)
+        except queue.Empty:
+            if p.exitcode is None:
+                continue
+        # the child may have exited right after putting its result
+        try:
+            return results.get(timeout=1)
+        except queue.Empty:
+            return {'pairs': pairs, 'error': "scenario process exited with code {}".format(p.exitcode)}
+
+
+def compare(current, previous):
+    old = {r['pairs']: r for r in previous['scenarios']}
+    print("\nCompared to {} ({}):".format(previous.get('version'), previous.get('commit')))
+    for r in current['scenarios']:
+        p = old.get(r['pairs'])
+        if not p or 'error' in r or 'error' in p:
+            continue
+        for k in ('p50_ms', 'p99_ms', 'ticks_per_sec'):
+            a, b = p['ticks'][k], r['ticks'][k]
+            print("  {:>6} pairs {:>14}: {:>10} -> {:>10} ({:+.1f}%)".format(
+                r['pairs'], k, a, b, (b - a) / a * 100 if a else 0))
+        a, b = p['peak_rss_mb'], r['peak_rss_mb']
+        print("  {:>6} pairs {:>14}: {:>10} -> {:>10} ({:+.1f}%)".format(
+            r['pairs'], 'peak_rss_mb', a, b, (b - a) / a * 100 if a else 0))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark exchanges and the indexer against local fake servers")
+    parser.add_argument('--pairs', default="1000,10000,50000", help="Comma separated listing sizes")
+    parser.add_argument('--exchanges', default="coingecko,kucoin,binance_us")
+    parser.add_argument('--tracked', type=int, default=200, help="Symbols tracked by the indexer")
+    parser.add_argument('--ticks', type=int, default=50)
+    parser.add_argument('--warmup', type=int, default=3)
+    parser.add_argument('--alloc-ticks', type=int, default=5)
+    parser.add_argument('--update-rate', type=float, default=1)
+    parser.add_argument('--poll-rate', type=float, default=5, help="Listing refresh interval of the pollers")
+    parser.add_argument('--latency', type=float, default=0.0)
+    parser.add_argument('--jitter', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--output', help="Result file, defaults to benchmarks/results/<version>-<time>.json")
+    parser.add_argument('--compare', help="Previous result file to compare against")
+    args = parser.parse_args()
+    args.exchanges = [e.strip() for e in args.exchanges.split(',') if e.strip()]
+
+    ctx = multiprocessing.get_context("spawn")
+    scenarios = []
+    for pairs in (int(p) for p in args.pairs.split(',')):
+        results = ctx.Queue()
+        p = ctx.Process(target=scenario_worker, args=(args, pairs, results))
+        p.start()
+        result = scenario_result(p, results, pairs)
+        p.join()
+        scenarios.append(result)
+        if 'error' in result:
+            print("{:>6} pairs: failed - {}".format(pairs, result['error']))
+            continue
+        t = result['ticks']
+        print("{:>6} pairs: p50 {:>8} ms  p99 {:>8} ms  {:>7} ticks/s  {:>9} quotes/s  rss {:>7} MB  alloc/tick {}".format(
+            pairs, t['p50_ms'], t['p99_ms'], t['ticks_per_sec'], t['quotes_per_sec'], result['peak_rss_mb'],
+            result['allocations'].get('peak_bytes_per_tick')))
+
+    report = {
+        'version': __version__,
+        'commit': git_commit(),
+        'created': datetime.utcnow().isoformat(),
+        'params': {k: v for k, v in vars(args).items() if k not in ('output', 'compare')},
+        'scenarios': scenarios,
+    }
+    path = args.output or os.path.join(RESULTS_DIR, "{}-{}.json".format(
+        __version__, datetime.utcnow().strftime('%Y%m%d-%H%M%S')))
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=2)
+    print("Saved results to {}".format(path))
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(report, json.load(f))
+
+
+if __name__ == '__main__':
+    main()
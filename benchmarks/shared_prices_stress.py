@@ -0,0 +1,79 @@
+import argparse
+import multiprocessing
+import os
+import time
+
+from crypto_bot.quotes import Quote
+from crypto_bot.shared_prices import SharedPriceTable
+
+EXCHANGES = ("KuCoin", "Binance US", "CoinGecko")
+
+
+def consistent(q):
+    # The writer encodes the same sequence number into every field of an update
+    n = int(q.price)
+    return q.perc == n % 100 and q.exchange == EXCHANGES[n % len(EXCHANGES)] and q.timestamp == n
+
+
+def writer(name, symbols, seconds, counts):
+    table = SharedPriceTable.attach(name, writer=True)
+    end = time.monotonic() + seconds
+    n = 1
+    while time.monotonic() < end:
+        table.publish({s: Quote(float(n), n % 100, EXCHANGES[n % len(EXCHANGES)], n) for s in symbols})
+        n += 1
+    counts.put(n - 1)
+    table.close()
+
+
+def reader(name, symbols, seconds, results):
+    table = SharedPriceTable.attach(name)
+    end = time.monotonic() + seconds
+    gets = torn = snapshots = torn_snapshot = 0
+    while time.monotonic() < end:
+        for s in symbols:
+            q = table.get(s)
+            if q is not None and not consistent(q):
+                torn += 1
+            gets += 1
+        quotes = table.read_all()
+        torn_snapshot += sum(1 for q in quotes.values() if not consistent(q))
+        snapshots += 1
+    results.put((gets, torn, snapshots, torn_snapshot))
+    table.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Hammer the shared price table from several processes")
+    parser.add_argument('--symbols', type=int, default=500)
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=5)
+    args = parser.parse_args()
+
+    symbols = ["sym{}".format(i) for i in range(args.symbols)]
+    table = SharedPriceTable.create("crypto_bot_stress_{}".format(os.getpid()), args.symbols)
+    ctx = multiprocessing.get_context("spawn")
+    counts, results = ctx.Queue(), ctx.Queue()
+    procs = [ctx.Process(target=writer, args=(table.name, symbols, args.seconds, counts))]
+    procs += [ctx.Process(target=reader, args=(table.name, symbols, args.seconds, results))
+              for _ in range(args.readers)]
+    for p in procs:
+        p.start()
+    updates = counts.get()
+    stats = [results.get() for _ in range(args.readers)]
+    for p in procs:
+        p.join()
+    table.unlink()
+
+    gets, torn, snapshots, torn_snapshot = (sum(s[i] for s in stats) for i in range(4))
+    print("writer: {} updates of {} symbols ({:.0f} quotes/s)".format(
+        updates, args.symbols, updates * args.symbols / args.seconds))
+    print("readers: {} gets ({:.0f}/s), {} torn".format(gets, gets / args.seconds, torn))
+    print("readers: {} full table reads ({:.0f}/s), {} torn quotes".format(
+        snapshots, snapshots / args.seconds, torn_snapshot))
+    if torn or torn_snapshot:
+        raise SystemExit("Shared table readers observed inconsistent data")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+import argparse
+import threading
+import time
+
+from crypto_bot.quotes import Quote, SnapshotPublisher
+from crypto_bot.ticker_store import TickerStore
+
+EXCHANGES = ("KuCoin", "Binance US", "CoinGecko")
+
+
+def consistent(price, perc, exchange, timestamp):
+    # Writers encode the same sequence number into every field of an update
+    n = int(price)
+    return perc == n % 100 and exchange == EXCHANGES[n % len(EXCHANGES)] and timestamp == n
+
+
+def writer(publisher, store, symbols, rows, stop, counts, i):
+    n = i
+    while not stop.is_set():
+        quotes = {}
+        for s in symbols:
+            exchange = EXCHANGES[n % len(EXCHANGES)]
+            quotes[s] = Quote(float(n), n % 100, exchange, n)
+            store.update(rows[s], n, n % 100, exchange, n)
+        publisher.publish(quotes)
+        counts[i] += 1
+        n += len(counts)
+
+
+def reader(publisher, store, symbols, rows, stop, results, i):
+    reads = torn_snapshot = torn_store = regressions = 0
+    last_version = 0
+    while not stop.is_set():
+        snap = publisher.current
+        if snap.version < last_version:
+            regressions += 1
+        last_version = snap.version
+        for s in symbols:
+            q = snap.get(s)
+            if q is not None and not consistent(*q):
+                torn_snapshot += 1
+            r = rows[s]
+            if store.timestamp[r] and not consistent(store.price[r], store.perc[r],
+                                                     store.exchange_name(r), store.timestamp[r]):
+                torn_store += 1
+            reads += 1
+    results[i] = (reads, torn_snapshot, torn_store, regressions)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Hammer price snapshot reads during concurrent updates")
+    parser.add_argument('--symbols', type=int, default=200)
+    parser.add_argument('--writers', type=int, default=3)
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=5)
+    args = parser.parse_args()
+
+    symbols = ["sym{}".format(i) for i in range(args.symbols)]
+    store = TickerStore(args.symbols)
+    for e in EXCHANGES:
+        store.exchange_id(e)
+    rows = {s: store.row(s) for s in symbols}
+    publisher = SnapshotPublisher()
+    stop = threading.Event()
+    counts = [0] * args.writers
+    results = [None] * args.readers
+
+    threads = [threading.Thread(target=writer, args=(publisher, store, symbols, rows, stop, counts, i))
+               for i in range(args.writers)]
+    threads += [threading.Thread(target=reader, args=(publisher, store, symbols, rows, stop, results, i))
+                for i in range(args.readers)]
+    for t in threads:
+        t.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+
+    reads = sum(r[0] for r in results)
+    print("updates published:   {} (snapshot version {})".format(sum(counts), publisher.current.version))
+    print("quote reads:         {}".format(reads))
+    print("torn snapshot reads: {}".format(sum(r[1] for r in results)))
+    print("torn column reads:   {}".format(sum(r[2] for r in results)))
+    print("version regressions: {}".format(sum(r[3] for r in results)))
+    if sum(r[1] + r[3] for r in results):
+        raise SystemExit("Snapshot readers observed inconsistent data")
+
+
+if __name__ == '__main__':
+    main()
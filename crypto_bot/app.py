@@ -1,48 +1,107 @@
 # Init application
 import asyncio
+import logging
+import os
 import sys
 
 from crypto_bot.bots import price_bot, bot_globals, info_bot, message_bot
 from crypto_bot.config import ConfigLoader, init_logger
 from crypto_bot.exchanges import Exchange
+from crypto_bot.http_client import close_all_async
+from crypto_bot.metrics import MetricsServer
 from crypto_bot.price_indexer import PriceIndexer
+from crypto_bot.snapshot import Snapshot
+from crypto_bot.startup import Startup
 from crypto_bot.twitter_collector import TwitterCollector
 
-try:
-    cfg = sys.argv[1]
-except:
-    cfg = "config.yml"
-
-bot_globals.config_loader = ConfigLoader(cfg)
-
-config = bot_globals.config_loader.active_config
-logger = init_logger(config['process']['log_level'])
-
-loop = asyncio.get_event_loop()
-bot_list = []
-
-price_bots = config['discord'].get('price_bots')
-info_bots = config['discord'].get('info_bots')
-msg_bots = config['discord'].get('message_bots')
-
-if price_bots or info_bots:
-    exchanges = [Exchange.create(c, dict(d)) for c, d in config['exchanges'].items()]
-    bot_globals.indexer = PriceIndexer(exchanges, config['process']['update_rate'])
-    bot_globals.indexer.wait_exchanges()
-
-    # Load price bots
-    if price_bots:
-        logger.info("Preload initial coins")
-
-        for sid, server in price_bots.items():
-            # init_coins = server['instances'].values()
-            # for c in init_coins:
-            #     bot_globals.indexer.add_new_coin(c)
 
+class App:
+
+    def __init__(self, cfg):
+        self.cfg = cfg
+        self.loop = asyncio.get_event_loop()
+        self.startup = Startup()
+        self.bot_list = []
+        self.indexer = None
+        self.metrics_server = None
+        self.config = None
+        self.startup_cfg = {}
+        self.logger = logging.getLogger("app")
+
+    def load_config(self):
+        with self.startup.phase("config"):
+            bot_globals.config_loader = ConfigLoader(self.cfg)
+            self.config = bot_globals.config_loader.active_config
+            self.logger = init_logger(self.config['process']['log_level'])
+            self.startup_cfg = self.config['process'].get('startup') or {}
+            self.startup.concurrency = self.startup_cfg.get('concurrency', self.startup.concurrency)
+        return self.config
+
+    @property
+    def config_dir(self):
+        return os.path.dirname(os.path.abspath(self.cfg))
+
+    @property
+    def price_bots(self):
+        return self.config['discord'].get('price_bots')
+
+    @property
+    def info_bots(self):
+        return self.config['discord'].get('info_bots')
+
+    @property
+    def msg_bots(self):
+        return self.config['discord'].get('message_bots')
+
+    def start_metrics(self, offset=0):
+        metrics_cfg = self.config['process'].get('metrics') or {}
+        if metrics_cfg and metrics_cfg.get('enabled', True):
+            self.metrics_server = MetricsServer(metrics_cfg.get('host', "127.0.0.1"),
+                                                metrics_cfg.get('port', 9100) + offset,
+                                                metrics_cfg.get('path', "/metrics")).start()
+
+    def start_exchanges(self):
+        with self.startup.phase("exchanges"):
+            exchanges = [Exchange.create(c, dict(d), self.config_dir) for c, d in self.config['exchanges'].items()]
+            process = self.config['process']
+            self.indexer = bot_globals.indexer = PriceIndexer(exchanges, process['update_rate'],
+                                                              process.get('change_threshold'),
+                                                              process.get('history'),
+                                                              Snapshot.from_config(process.get('snapshot'),
+                                                                                   self.config_dir))
+            self.indexer.load_snapshot()
+            self.indexer.start_exchanges(self.loop)
+            self.loop.run_until_complete(self.indexer.wait_exchanges())
+
+        if self.price_bots:
+            with self.startup.phase("indexer preload"):
+                self.preload_coins()
+
+    def preload_coins(self):
+        symbols = sorted({c for server in self.price_bots.values() for c in server['instances'].values()})
+        results = self.loop.run_until_complete(self.startup.in_threads(self.indexer.add_new_coin, symbols))
+        for s, r in zip(symbols, results):
+            if isinstance(r, Exception):
+                self.logger.error("Failed preloading coin {}: {}".format(s, r))
+        self.logger.info("Preloaded {} coins".format(len(symbols)))
+
+    def create_bots(self, keep=None):
+        keep = keep or (lambda token: True)
+        with self.startup.phase("bot setup"):
+            if self.price_bots:
+                self.create_price_bots(keep)
+            if self.info_bots:
+                self.create_info_bots(keep)
+            if self.msg_bots:
+                self.create_message_bots(keep)
+
+    def create_price_bots(self, keep):
+        for sid, server in self.price_bots.items():
             for i, c in enumerate(server['instances'].items()):
-                bot_globals.indexer.add_new_coin(c[1])
+                if not keep(c[0]):
+                    continue
                 chat_id = str(i + 1) if i + 1 > 9 else "0{}".format(i + 1)
-                bot = price_bot.create_bot(
+                self.bot_list.append(price_bot.create_bot(
                     token=c[0],
                     coin=c[1],
                     status=None,
@@ -50,29 +109,28 @@ if price_bots or info_bots:
                     chat_id=chat_id,
                     command_roles=server.get('command_roles'),
                     use_coin_avatar=server.get('use_coin_avatar'),
+                    edit_limits=server.get('edit_limits'),
                     home_id=sid,
                     indexer=bot_globals.indexer,
-                )
-
-                loop.create_task(bot.start())
-                bot_list.append(bot)
+                ))
 
-    # Load info bots
-    if info_bots:
-        twitter_cfg = config.get('twitter')
+    def create_info_bots(self, keep):
+        twitter_cfg = self.config.get('twitter')
         twitter_collector = TwitterCollector(twitter_cfg) if twitter_cfg else None
 
-        for token, cfg in info_bots.items():
+        for token, cfg in self.info_bots.items():
+            if not keep(token):
+                continue
 
             cfg['token'] = token
             countdowns = cfg.get('countdowns') or {}
             cfg['countdowns'] = []
             for c in countdowns:
-                alert = config['discord']['countdowns'][c]
+                alert = self.config['discord']['countdowns'][c]
                 alert['channels'] = countdowns[c]
                 cfg['countdowns'].append(alert)
 
-            bot = info_bot.create_bot(
+            self.bot_list.append(info_bot.create_bot(
                 token=cfg['token'],
                 name=cfg['name'],
                 status=cfg.get('status'),
@@ -82,31 +140,98 @@ if price_bots or info_bots:
                 twitter_notifications=cfg.get('twitter_notifications'),
                 indexer=bot_globals.indexer,
                 twitter_collector=twitter_collector
-            )
-            loop.create_task(bot.start())
-            bot_list.append(bot)
-
-    bot_globals.indexer.run()
-
-if msg_bots:
-
-    for token, cfg in msg_bots.items():
-        cfg['token'] = token
-
-        bot = message_bot.create_bot(
-            token=cfg['token'],
-            name=cfg['name'],
-            command_roles=cfg.get('command_roles'),
-            log_channel_mismatch=cfg.get('log_channel_mismatch'),
-            status=cfg.get('status'),
-            avatar=cfg.get('avatar'),
-            mappings=cfg['channel_mappings']
-        )
-
-        loop.create_task(bot.start())
-        bot_list.append(bot)
-
-if bot_list:
-    loop.run_forever()
-else:
-    logger.warning("No bots were defined in the config.")
+            ))
+
+    def create_message_bots(self, keep):
+        for token, cfg in self.msg_bots.items():
+            if not keep(token):
+                continue
+            cfg['token'] = token
+
+            self.bot_list.append(message_bot.create_bot(
+                token=cfg['token'],
+                name=cfg['name'],
+                command_roles=cfg.get('command_roles'),
+                log_channel_mismatch=cfg.get('log_channel_mismatch'),
+                relay_concurrency=cfg.get('relay_concurrency', 10),
+                status=cfg.get('status'),
+                avatar=cfg.get('avatar'),
+                mappings=cfg['channel_mappings']
+            ))
+
+    async def login(self, bot):
+        try:
+            await bot.login(bot.token)
+        except Exception:
+            await bot.close()
+            raise
+        self.loop.create_task(bot.connect())
+
+    def login_bots(self):
+        limit = self.startup_cfg.get('login_concurrency', 3)
+        with self.startup.phase("bot login"):
+            results = self.loop.run_until_complete(
+                self.startup.bounded([lambda b=b: self.login(b) for b in self.bot_list], limit))
+            failed = [(b, r) for b, r in zip(self.bot_list, results) if isinstance(r, Exception)]
+            for b, r in failed:
+                self.logger.error("Login failed for bot {}: {}".format(b.name, r))
+                self.bot_list.remove(b)
+            self.logger.info("Logged in {} of {} bots".format(len(self.bot_list), len(results)))
+
+    async def shutdown(self):
+        tasks = []
+        if self.indexer:
+            self.indexer.stop()
+            tasks.extend(self.indexer.stop_exchanges())
+        for b in self.bot_list:
+            try:
+                await b.close()
+            except Exception as e:
+                self.logger.error("Error closing bot {}: {}".format(b.name, e))
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await close_all_async()
+        if self.metrics_server:
+            self.metrics_server.stop()
+
+    def run_forever(self):
+        try:
+            self.loop.run_forever()
+        except KeyboardInterrupt:
+            self.logger.info("Shutting down...")
+        finally:
+            self.loop.run_until_complete(self.shutdown())
+
+    def run(self):
+        self.start_metrics()
+        if self.price_bots or self.info_bots:
+            self.start_exchanges()
+        self.create_bots()
+        if self.indexer:
+            self.indexer.run()
+
+        if not self.bot_list:
+            self.logger.warning("No bots were defined in the config.")
+            return
+        self.login_bots()
+        self.logger.info(self.startup.summary())
+        self.run_forever()
+
+
+def main():
+    try:
+        cfg = sys.argv[1]
+    except:
+        cfg = "config.yml"
+
+    app = App(cfg)
+    config = app.load_config()
+    workers = (config['process'].get('supervisor') or {}).get('workers', 1)
+    if workers > 1:
+        from crypto_bot.supervisor import Supervisor
+        Supervisor(cfg, config, workers).run()
+    else:
+        app.run()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,8 +1,12 @@
+import asyncio
+import functools
 import logging
 
 import discord
 from discord.ext.commands import Bot
 
+from crypto_bot.bots.fanout import FanOut
+
 
 class BaseBot(Bot):
 
@@ -12,6 +16,7 @@ class BaseBot(Bot):
                  status,
                  avatar=None,
                  *args,
+                 relay_concurrency=10,
                  **kwargs):
         super(BaseBot, self).__init__(case_insensitive=True, *args, **kwargs)
         self.token = token
@@ -19,21 +24,30 @@ class BaseBot(Bot):
         self.avatar = avatar
         self.status = status
         self.command_roles = set()
+        self.fanout = FanOut(name, relay_concurrency)
         self.logger = logging.getLogger("{} bot".format(self.name))
         self.logger.info("Starting {} bot...".format(self.name))
 
+    async def in_executor(self, fn, *args, **kwargs):
+        return await asyncio.get_event_loop().run_in_executor(None, functools.partial(fn, *args, **kwargs))
+
     async def message_channels(self, msg, channels):
+        targets = []
         for c in channels:
             z = self.get_channel(c)
-            try:
-                if not z:
-                    raise AssertionError("Channel {} does not exist".format(c))
-                await z.send(msg)
-                self.logger.debug("Sent message '{}...' to channel {} ({}) on {}".format(msg[:20], z.name, c, z.guild.name))
-            except Exception as e:
-
-                info = "({}) on server {}".format(z.name, z.guild.name) if z else ""
-                self.logger.error("Failed sending to channel {} - {} due to {}".format(c, info, e))
+            if not z:
+                self.logger.error("Failed sending to channel {} - channel does not exist".format(c))
+                continue
+            targets.append(z)
+        results = await self.fanout.relay(msg, targets)
+        for z, r in zip(targets, results):
+            if isinstance(r, Exception):
+                self.logger.error("Failed sending to channel {} - ({}) on server {} due to {}".format(
+                    z.id, z.name, z.guild.name, r))
+            else:
+                self.logger.debug("Sent message '{}...' to channel {} ({}) on {}".format(
+                    msg[:20], z.name, z.id, z.guild.name))
+        return results
 
     async def update_nick(self):
         for g in self.guilds:
@@ -1,17 +1,29 @@
+import time
+
 from discord.ext.commands import CommandNotFound, MissingRequiredArgument
 
+from crypto_bot import metrics
+
 config_loader = None
 indexer = None
 
+COMMAND_SECONDS = metrics.histogram('crypto_bot_command_seconds', 'Discord command latency', ('bot', 'command'))
+COMMAND_ERRORS = metrics.counter('crypto_bot_command_errors_total', 'Discord commands that raised', ('bot', 'command'))
+
+
+def format_price(symbol, coin, q):
+    if q is None:
+        return "{}/{}: N/A - not yet priced".format(symbol.upper(), coin.name or coin.coin_id)
+    return "{}/{}: ${}, change: {}% - indexed from {}" \
+        .format(symbol.upper(), coin.name or coin.coin_id, q.price, q.perc, q.exchange)
+
 
 def add_price_commands(bot):
     @bot.command(name='price', help='Get a price. Usage: !price doge')
     async def get_price(ctx, symbol):
         try:
-            c = indexer.get_coin(symbol, wait=True)
-            msg = "{}/{}: ${}, change: {}% - indexed from {}" \
-                .format(symbol.upper(), c.name or c.coin_id, c.price, c.perc, c.last_exchange)
-            await ctx.send(msg)
+            c = await bot.in_executor(indexer.get_coin, symbol, wait=True)
+            await ctx.send(format_price(symbol, c, indexer.get_quote(symbol)))
         except Exception as e:
             await ctx.send("Error: {}".format(e))
 
@@ -23,8 +35,19 @@ def add_shared_setup(bot):
         bot.logger.info("{} is ready!".format(bot.name))
         await bot.ready()
 
+    @bot.event
+    async def on_command(ctx):
+        ctx.started = time.monotonic()
+
+    @bot.event
+    async def on_command_completion(ctx):
+        COMMAND_SECONDS.observe(time.monotonic() - ctx.started, bot=bot.name, command=ctx.command.qualified_name)
+
     @bot.event
     async def on_command_error(ctx, error):
+        if ctx.command and hasattr(ctx, 'started'):
+            COMMAND_SECONDS.observe(time.monotonic() - ctx.started, bot=bot.name, command=ctx.command.qualified_name)
+            COMMAND_ERRORS.inc(bot=bot.name, command=ctx.command.qualified_name)
         if isinstance(error, CommandNotFound) or isinstance(error, MissingRequiredArgument):
             try:
                 int(ctx.invoked_with)
@@ -0,0 +1,148 @@
+import asyncio
+import logging
+import time
+
+from discord import HTTPException
+
+from crypto_bot import metrics
+from crypto_bot.ratelimit import TokenBucket
+
+EDITS = metrics.counter('crypto_bot_discord_edits_total', 'Discord nick and presence edits', ('bot', 'kind'))
+EDIT_FAILURES = metrics.counter('crypto_bot_discord_edit_failures_total', 'Failed Discord edits', ('bot',))
+EDIT_SECONDS = metrics.histogram('crypto_bot_discord_edit_seconds', 'Discord edit latency', ('bot', 'kind'))
+EDITS_COALESCED = metrics.counter('crypto_bot_discord_edits_coalesced_total',
+                                  'Pending Discord edits replaced by a newer value', ('bot',))
+EDITS_RATE_LIMITED = metrics.counter('crypto_bot_discord_edits_rate_limited_total',
+                                     'Discord edits that hit a 429', ('bot', 'kind'))
+
+# Nick edits are HTTP calls bucketed per guild and share the global HTTP limit,
+# presence updates go over the gateway and are limited per connection
+ROUTES = {
+    'nick': {'rate': 1.0, 'burst': 1, 'per_major': True, 'global': True},
+    'presence': {'rate': 5 / 60, 'burst': 5, 'per_major': False, 'global': False},
+}
+GLOBAL_LIMIT = {'rate': 50.0, 'burst': 50}
+
+
+class EditScheduler:
+
+    def __init__(self, name, limits=None):
+        self.name = name
+        self.routes = {r: dict(spec) for r, spec in ROUTES.items()}
+        limits = limits or {}
+        unknown = set(limits) - set(ROUTES) - {'global'}
+        if unknown:
+            raise ValueError("Unknown edit limit {} for {}, expected one of: {}".format(
+                ", ".join(sorted(unknown)), name, ", ".join(sorted(set(ROUTES) | {'global'}))))
+        for r, spec in limits.items():
+            if r in self.routes:
+                self.routes[r].update(spec)
+        g = dict(GLOBAL_LIMIT, **(limits.get('global') or {}))
+        self.global_bucket = TokenBucket(g['rate'], g['burst'])
+        self.buckets = {}
+        self.pending = {}
+        self.inflight = set()
+        self.last = {}
+        self.wakeup = None
+        self.task = None
+        self.logger = logging.getLogger("{} edits".format(name))
+
+    def start(self):
+        if self.task is None or self.task.done():
+            self.wakeup = asyncio.Event()
+            self.task = asyncio.ensure_future(self.run())
+        return self.task
+
+    def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+
+    def bucket(self, route, major):
+        spec = self.routes[route]
+        key = (route, major if spec['per_major'] else None)
+        b = self.buckets.get(key)
+        if b is None:
+            b = self.buckets[key] = TokenBucket(spec['rate'], spec['burst'])
+        return b
+
+    def submit(self, key, route, major, value, send):
+        if self.last.get(key) == value:
+            self.pending.pop(key, None)
+            return False
+        if key in self.pending:
+            if self.pending[key][2] == value:
+                return False
+            EDITS_COALESCED.inc(bot=self.name)
+        self.pending[key] = (route, major, value, send)
+        if self.wakeup:
+            self.wakeup.set()
+        return True
+
+    def forget(self, key):
+        self.pending.pop(key, None)
+        self.last.pop(key, None)
+
+    def wait_time(self, route, major):
+        bucket = self.bucket(route, major)
+        wait = bucket.wait_time()
+        if self.routes[route]['global']:
+            wait = max(wait, self.global_bucket.wait_time())
+        return wait
+
+    def take(self, route, major):
+        self.bucket(route, major).take()
+        if self.routes[route]['global']:
+            self.global_bucket.take()
+
+    async def run(self):
+        while True:
+            wait = None
+            for key, (route, major, value, send) in list(self.pending.items()):
+                if key in self.inflight:
+                    continue
+                w = self.wait_time(route, major)
+                if w > 0:
+                    wait = w if wait is None else min(wait, w)
+                    continue
+                self.take(route, major)
+                del self.pending[key]
+                self.inflight.add(key)
+                asyncio.ensure_future(self.send(key, route, major, value, send))
+            self.wakeup.clear()
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), wait)
+            except asyncio.TimeoutError:
+                pass
+
+    async def send(self, key, route, major, value, send):
+        start = time.monotonic()
+        try:
+            await send(value)
+            self.last[key] = value
+            EDITS.inc(bot=self.name, kind=route)
+        except HTTPException as e:
+            EDIT_FAILURES.inc(bot=self.name)
+            # discord.py retries 429s itself and only raises one once its retries are exhausted
+            if e.status == 429:
+                retry = float(e.response.headers.get('Retry-After') or 1)
+                self.bucket(route, major).pause(retry)
+                EDITS_RATE_LIMITED.inc(bot=self.name, kind=route)
+                self.pending.setdefault(key, (route, major, value, send))
+                self.logger.warning("Rate limited on {} edit, retrying in {}s".format(route, retry))
+            else:
+                self.logger.error("{}: {}".format(e, e.response.url))
+        except Exception as e:
+            EDIT_FAILURES.inc(bot=self.name)
+            self.logger.error("Failed {} edit: {}".format(route, e))
+        finally:
+            EDIT_SECONDS.observe(time.monotonic() - start, bot=self.name, kind=route)
+            self.inflight.discard(key)
+            if self.wakeup:
+                self.wakeup.set()
+
+    def stats(self):
+        return {
+            'pending': len(self.pending),
+            'inflight': len(self.inflight),
+            'buckets': len(self.buckets),
+        }
@@ -0,0 +1,61 @@
+import asyncio
+import logging
+import time
+
+from crypto_bot import metrics
+
+RELAY_SECONDS = metrics.histogram('crypto_bot_relay_seconds', 'Relay fan-out latency per message', ('bot',))
+RELAY_TARGETS = metrics.counter('crypto_bot_relay_targets_total', 'Channels written by relayed messages', ('bot',))
+RELAY_FAILURES = metrics.counter('crypto_bot_relay_failures_total', 'Channels a relayed message failed to reach',
+                                 ('bot',))
+SEND_SECONDS = metrics.histogram('crypto_bot_relay_send_seconds', 'Latency of a single relayed channel send',
+                                 ('bot',))
+
+
+# Channel messages are rate limited per channel, so every channel is its own bucket. Sends to one
+# bucket are chained in submission order, different buckets run concurrently up to the limit.
+class FanOut:
+
+    def __init__(self, name, concurrency=10):
+        self.name = name
+        self.concurrency = concurrency
+        self.semaphore = None
+        self.tails = {}
+        self.logger = logging.getLogger("{} relay".format(name))
+
+    @staticmethod
+    def bucket(channel):
+        return channel.id
+
+    async def send(self, channel, msg, previous):
+        if previous is not None:
+            await asyncio.wait([previous])
+        if self.semaphore is None:
+            self.semaphore = asyncio.Semaphore(self.concurrency)
+        async with self.semaphore:
+            start = time.monotonic()
+            try:
+                await channel.send(msg)
+            finally:
+                SEND_SECONDS.observe(time.monotonic() - start, bot=self.name)
+
+    def submit(self, channel, msg):
+        key = self.bucket(channel)
+        task = asyncio.ensure_future(self.send(channel, msg, self.tails.get(key)))
+        self.tails[key] = task
+        task.add_done_callback(lambda t: self.tails.get(key) is t and self.tails.pop(key))
+        return task
+
+    async def relay(self, msg, channels):
+        start = time.monotonic()
+        tasks = [self.submit(c, msg) for c in channels]
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        elapsed = time.monotonic() - start
+        failed = sum(1 for r in results if isinstance(r, Exception))
+        RELAY_SECONDS.observe(elapsed, bot=self.name)
+        RELAY_TARGETS.inc(len(tasks) - failed, bot=self.name)
+        if failed:
+            RELAY_FAILURES.inc(failed, bot=self.name)
+        self.logger.debug("Relayed '{}...' to {} channels in {:.3f}s ({} failed)".format(
+            msg[:20], len(tasks), elapsed, failed))
+        return results
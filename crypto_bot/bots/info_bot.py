@@ -5,6 +5,7 @@ from datetime import datetime
 from crypto_bot.bots import bot_globals
 from crypto_bot.bots.base_bot import BaseBot
 from crypto_bot.countdown import Countdown
+from crypto_bot.history import parse_window
 from crypto_bot.resources.rules import RULES
 
 
@@ -69,18 +70,18 @@ class InfoBot(BaseBot):
             await asyncio.sleep(self.twitter_collector.update_rate)
 
     async def check_new_coins(self):
+        cursors = await self.in_executor(self.indexer.listing_cursors)
         while True:
             try:
-                new_coins_by_exch = self.indexer.check_new_coins()
+                new_coins_by_exch = await self.in_executor(self.indexer.new_coins_since, cursors)
                 for e, coins in new_coins_by_exch.items():
                     for c in coins:
-                        info = self.indexer.get_coin(c, wait=True, info=True).info
+                        info = (await self.in_executor(self.indexer.get_coin, c, wait=True, info=True)).info
                         msg = "New coin {}/{} added to exchange: {}!".format(c.upper(), info['name'], e)
                         self.logger.info(msg)
                         await self.message_channels(msg, self.new_coin_notifications['channels'])
             except Exception as e:
                 self.logger.error("Error checking new coins: {}".format(e))
-            self.indexer.clear_new_coins()
             await asyncio.sleep(360)
 
 
@@ -92,7 +93,7 @@ def create_bot(**kwargs):
     @bot.command(name='ath', help='Get all time high - !ath')
     async def ath(ctx, symbol):
         try:
-            c = bot.indexer.get_coin(symbol, wait=True, info=True)
+            c = await bot.in_executor(bot.indexer.get_coin, symbol, wait=True, info=True)
             d = c.info['ath_date']
             if isinstance(d, datetime):
                 d = d.strftime('%m/%d/%Y')
@@ -110,7 +111,8 @@ def create_bot(**kwargs):
     @bot.command(name='info', help='Get coin info. Usage: !info DOGE')
     async def get_info(ctx, symbol):
         try:
-            c = bot.indexer.get_coin(symbol, wait=True, info=True)
+            c = await bot.in_executor(bot.indexer.get_coin, symbol, wait=True, info=True)
+            q = bot.indexer.get_quote(symbol)
             message = \
                 """
 **Ticker**: {ticker}
@@ -156,15 +158,15 @@ def create_bot(**kwargs):
                 image=c.info['image'],
                 ticker=symbol.upper(),
                 name=c.name,
-                price=c.price,
-                change=c.perc,
+                price=q.price if q else "N/A",
+                change=q.perc if q else "N/A",
                 ath=c.info['ath'],
                 ath_date=d,
                 supply=supply,
                 mined=mined,
                 circulating=circulating,
                 cap=market_cap,
-                exchange=c.last_exchange,
+                exchange=q.exchange if q else "not yet priced",
                 homepage=c.info['homepage'],
                 coingecko=c.info['coingecko'],
                 repos=repos or "None provided"
@@ -190,6 +192,37 @@ def create_bot(**kwargs):
             bot.logger.error("Error in commmand get_info: {}".format(e))
             await ctx.send("Error: {}".format(e))
 
+    @bot.command(name='history', help='Price range over a window from memory. Usage: !history BTC 4h')
+    async def history(ctx, symbol, window="1h"):
+        try:
+            stats = await bot.in_executor(bot.indexer.history.stats, symbol, parse_window(window))
+            if not stats:
+                await ctx.send("No price history recorded for {}".format(symbol.upper()))
+                return
+            since = datetime.utcfromtimestamp(stats['start']).strftime('%m/%d %H:%M UTC')
+            msg = "**{}** over {} (since {}): low ${}, high ${}, now ${} - change {}{}%".format(
+                symbol.upper(), window, since, stats['min'], stats['max'], stats['last'],
+                "+" if stats['change'] >= 0 else "", round(stats['change_perc'], 2))
+            await ctx.send(msg)
+        except Exception as e:
+            bot.logger.error("Error in commmand history: {}".format(e))
+            await ctx.send("Error: {}".format(e))
+
+    @bot.command(name='chart', help='Sparkline chart from memory. Usage: !chart BTC 24h')
+    async def chart(ctx, symbol, window="24h"):
+        try:
+            seconds = parse_window(window)
+            line = await bot.in_executor(bot.indexer.history.sparkline, symbol, seconds)
+            if not line:
+                await ctx.send("No price history recorded for {}".format(symbol.upper()))
+                return
+            stats = await bot.in_executor(bot.indexer.history.stats, symbol, seconds)
+            await ctx.send("**{}** {}: `{}` ${} - ${}".format(
+                symbol.upper(), window, line, stats['min'], stats['max']))
+        except Exception as e:
+            bot.logger.error("Error in commmand chart: {}".format(e))
+            await ctx.send("Error: {}".format(e))
+
     @bot.command(name='feed', help='Get some soup - !feed')
     async def feed(ctx):
         try:
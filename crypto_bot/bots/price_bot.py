@@ -1,15 +1,12 @@
 import asyncio
 import logging
-import threading
-import time
-
 
 import discord
-from discord import HTTPException
 from discord.ext.commands import MissingRequiredArgument
 
 from crypto_bot.bots import bot_globals
 from crypto_bot.bots.base_bot import BaseBot
+from crypto_bot.bots.edit_scheduler import EditScheduler
 from crypto_bot.error import CoinNotFoundException
 
 
@@ -24,10 +21,14 @@ class CoinAssociation:
         self.coin = coin.upper()
         self.image = None
 
+    async def edit_nick(self, nick):
+        await self.membership.edit(nick=nick)
+
 
 class PriceBot(BaseBot):
 
-    def __init__(self, coin, chat_id, command_roles, use_coin_avatar, home_id, indexer, *args, **kwargs):
+    def __init__(self, coin, chat_id, command_roles, use_coin_avatar, home_id, indexer, edit_limits=None,
+                 *args, **kwargs):
         super(PriceBot, self).__init__(name=coin, *args, **kwargs)
         self.coin = coin.upper()
         self.chat_id = chat_id
@@ -36,71 +37,135 @@ class PriceBot(BaseBot):
         self.home_id = home_id
         self.associations = {}
         self.indexer = indexer
+        self.subscription = None
+        self.changed = None
+        self.edits = EditScheduler(self.name, edit_limits)
 
     async def set_coin(self, guild, symbol):
         symbol = str(symbol).lower()
-        coin = self.indexer.get_coin(symbol, wait=True)
+        coin = await self.in_executor(self.indexer.get_coin, symbol, wait=True)
         self.associations[guild].update(symbol)
         self.logger = logging.getLogger("{} bot".format(symbol.upper()))
+        self.subscribe()
         await self.update()
         return coin
 
     async def ready(self):
-        threading.Thread(target=self.update_memberships).start()
+        self.sync_memberships()
+        if self.changed is not None:
+            self.subscribe()
+            self.changed.set()
+            return
+        self.changed = asyncio.Event()
+        self.edits.start()
+        self.subscribe()
         await self.status_loop()
 
+    def associate(self, guild):
+        me = guild.me
+        if me is None:
+            self.logger.warning("No member found for {} in {}".format(self.user.id, guild.id))
+            return False
+        a = self.associations.get(guild.id)
+        if a is None:
+            self.associations[guild.id] = CoinAssociation(self.coin, me)
+        else:
+            a.membership = me
+        return True
+
+    def sync_memberships(self):
+        ids = set()
+        for g in self.guilds:
+            ids.add(g.id)
+            self.associate(g)
+        for gid in set(self.associations) - ids:
+            self.forget_guild(gid)
+
+    def forget_guild(self, guild_id):
+        self.associations.pop(guild_id, None)
+        self.edits.forget(('nick', guild_id))
+
+    def add_guild(self, guild):
+        if self.associate(guild) and self.changed is not None:
+            self.changed.set()
+
+    def remove_guild(self, guild):
+        self.forget_guild(guild.id)
+        self.subscribe()
+
+    def subscribe(self):
+        symbols = {a.coin.lower() for a in self.associations.values()}
+        symbols.add(self.coin.lower())
+        if self.subscription:
+            if self.subscription.symbols == symbols:
+                return
+            self.subscription.cancel()
+        self.subscription = self.indexer.bus.subscribe(symbols, self.on_price_change, asyncio.get_event_loop())
+
+    def on_price_change(self, change):
+        self.changed.set()
+
     async def status_loop(self):
         await self.update_coin_icon(self.coin)
         while True:
             await self.update()
-            await asyncio.sleep(5)
+            await self.changed.wait()
+            self.changed.clear()
 
     async def log_send(self, ctx, msg):
         await ctx.send(msg)
         self.logger.info("{}: {}".format(ctx.guild.name, msg))
 
     async def update(self):
-        for g, a in self.associations.items():
+        for g, a in list(self.associations.items()):
             try:
-                c = self.indexer.get_coin(a.coin)
-                act = discord.Activity(type=discord.ActivityType.watching, name="{0} % {1}".format(c.perc, c.direction))
-                await a.membership.edit(nick="!{0} {1} {2}".format(self.chat_id, a.coin, c.price))
-                await self.change_presence(status=discord.Status.online, activity=act)
-                await asyncio.sleep(0.25)
+                q = self.indexer.get_quote(a.coin)
+                if q is None:
+                    continue
+                nick = "!{0} {1} {2}".format(self.chat_id, a.coin, q.price)
+                activity = "{0} % {1}".format(q.perc, q.direction)
+                self.edits.submit(('nick', g), 'nick', g, nick, a.edit_nick)
+                self.edits.submit(('presence',), 'presence', None, activity, self.set_activity)
             except Exception as e:
-                if isinstance(e, HTTPException):
-                    self.logger.error("{}: {}".format(e, e.response.url))
-                else:
-                    self.logger.error(e)
+                self.logger.error(e)
+
+    async def set_activity(self, activity):
+        act = discord.Activity(type=discord.ActivityType.watching, name=activity)
+        await self.change_presence(status=discord.Status.online, activity=act)
 
     async def update_coin_icon(self, symbol):
         if self.use_coin_avatar:
             try:
-                av = self.indexer.get_icon(symbol)
+                av = await self.in_executor(self.indexer.get_icon, symbol)
+                cache = self.indexer.icon_cache
+                if cache is None:
+                    self.logger.debug("No icon cache available, updating avatar unconditionally")
+                elif not await self.in_executor(cache.avatar_changed, self.user.id, av):
+                    self.logger.info("Icon for {} is unchanged, skipping avatar update".format(symbol))
+                    return
                 await self.user.edit(avatar=av)
+                if cache is not None:
+                    await self.in_executor(cache.set_avatar, self.user.id, av)
                 self.logger.info("Set icon for {} successfully!".format(symbol))
             except Exception as e:
                 self.logger.error("Failed to set icon: {}".format(e))
 
-    def update_memberships(self):
-        while True:
-            for g in self.guilds:
-                if g.id not in self.associations:
-                    m = [u for u in g.members if u.id == self.user.id]
-                    if not m:
-                        self.logger.warning("No matching member id found for {}".format(g.id))
-                        continue
-                    elif len(m) > 1:
-                        self.logger.warning("Multiple matches found for id for {} - using first match".format(g.id))
-                    self.associations[g.id] = CoinAssociation(self.coin, m[0])
-            time.sleep(60)
-
 
 def create_bot(**kwargs):
     bot = PriceBot(command_prefix="!{} ".format(kwargs['chat_id'].lstrip("0")), **kwargs)
     bot_globals.add_shared_setup(bot)
     bot_globals.add_price_commands(bot)
 
+    @bot.event
+    async def on_guild_join(guild):
+        bot.logger.info("Joined {}".format(guild.name))
+        bot.add_guild(guild)
+
+    @bot.event
+    async def on_guild_remove(guild):
+        bot.logger.info("Removed from {}".format(guild.name))
+        bot.remove_guild(guild)
+
     @bot.command(name='set', help='Sets a specific coin by symbol. Usage: ![#] set DOGE - # indicates bot number')
     async def set_coin(ctx, symbol):
         if not bot.user_role_allowed(ctx):
@@ -113,8 +178,10 @@ def create_bot(**kwargs):
             if bot.home_id == ctx.guild.id:
                 cl.persist_coin(ctx.guild.id, bot.token, symbol)
                 await bot.update_coin_icon(symbol)
+            q = bot.indexer.get_quote(c.symbol)
             await bot.log_send(ctx, "Set bot #{} to {} - {} successfully! - indexed from {}"
-                           .format(bot.chat_id, c.symbol.upper(), c.name or c.coin_id, c.last_exchange))
+                           .format(bot.chat_id, c.symbol.upper(), c.name or c.coin_id,
+                                   q.exchange if q else "N/A (not yet priced)"))
         except CoinNotFoundException as e:
             await ctx.send(e)
         except Exception as e:
@@ -19,24 +19,100 @@ class ConfigLoader:
     # self.persist_coin()
 
     def config_schema(self) -> Schema:
+        http = {
+            Optional('pool_size'): int,
+            Optional('host_pool_sizes'): {str: int},
+            Optional('connect_timeout'): Or(float, int),
+            Optional('read_timeout'): Or(float, int),
+        }
         return Schema({
             Optional('exchanges'): {
                 Optional('coingecko'): {
                     'priority': int,
-                    Optional('coin_overrides'): {str: str}
+                    Optional('coin_overrides'): {str: str},
+                    Optional('base_url'): str,
+                    Optional('update_rate'): Or(float, int),
+                    Optional('jitter'): Or(float, int),
+                    Optional('rate_limit'): {
+                        Optional('requests_per_minute'): Or(float, int),
+                        Optional('burst'): int,
+                        Optional('max_retries'): int,
+                        Optional('max_url_length'): int,
+                        Optional('max_workers'): int,
+                    },
+                    Optional('info_cache'): {
+                        Optional('size'): int,
+                        Optional('static_ttl'): Or(float, int),
+                        Optional('market_ttl'): Or(float, int),
+                    },
+                    Optional('icon_cache'): {
+                        Optional('path'): str,
+                        Optional('max_bytes'): int,
+                        Optional('ttl'): Or(float, int),
+                    },
+                    Optional('http'): http,
                 },
                 Optional('kucoin'): {
                     'update_rate': Or(float, int),
                     'priority': int,
+                    Optional('jitter'): Or(float, int),
+                    Optional('stream'): bool,
+                    Optional('base_url'): str,
+                    Optional('stream_url'): str,
+                    Optional('http'): http,
                 },
                 Optional('binance_us'): {
                     'update_rate': Or(float, int),
                     'priority': int,
+                    Optional('jitter'): Or(float, int),
+                    Optional('stream'): bool,
+                    Optional('base_url'): str,
+                    Optional('stream_url'): str,
+                    Optional('http'): http,
                 }
             },
             'process': {
                 'log_level': Or('info', 'debug', 'INFO', 'DEBUG'),
                 'update_rate': Or(float, int),
+                Optional('change_threshold'): {
+                    Optional('price'): Or(float, int),
+                    Optional('perc'): Or(float, int),
+                },
+                Optional('history'): [{
+                    'resolution': Or(float, int),
+                    'capacity': int,
+                }],
+                Optional('metrics'): {
+                    Optional('enabled'): bool,
+                    Optional('host'): str,
+                    Optional('port'): int,
+                    Optional('path'): str,
+                },
+                Optional('supervisor'): {
+                    Optional('workers'): int,
+                    Optional('host'): str,
+                    Optional('port'): int,
+                    Optional('check_interval'): Or(float, int),
+                    Optional('heartbeat_timeout'): Or(float, int),
+                    Optional('startup_timeout'): Or(float, int),
+                    Optional('max_backoff'): Or(float, int),
+                    Optional('stable_after'): Or(float, int),
+                    Optional('report_interval'): Or(float, int),
+                    Optional('price_table'): {
+                        Optional('capacity'): int,
+                        Optional('symbol_size'): int,
+                    },
+                },
+                Optional('startup'): {
+                    Optional('concurrency'): int,
+                    Optional('login_concurrency'): int,
+                },
+                Optional('snapshot'): {
+                    Optional('enabled'): bool,
+                    Optional('path'): str,
+                    Optional('interval'): Or(float, int),
+                    Optional('max_age'): Or(float, int),
+                },
             },
             Optional('twitter'): {
                 'access_token': str,
@@ -51,6 +127,10 @@ class ConfigLoader:
                     Optional('name'): str,
                     Optional('command_roles'): Or([str], {str}),
                     Optional('use_coin_avatar'): Or(None, bool),
+                    Optional('edit_limits'): {Or('nick', 'presence', 'global'): {
+                        Optional('rate'): Or(float, int),
+                        Optional('burst'): int,
+                    }},
                     'instances': {str: str},
                 }},
                 Optional('info_bots'): {str: {
@@ -86,6 +166,7 @@ class ConfigLoader:
                     Optional('avatar'): str,
                     Optional('command_roles'): Or([str], {str}),
                     Optional('log_channel_mismatch'): Or(None, bool),
+                    Optional('relay_concurrency'): int,
                     'channel_mappings': [{
                         'read_channels': Or([int], {'file': str, 'columns': Or(str, [str]),
                                                     Optional('ignore'): Or(str, [str])}),
@@ -2,10 +2,25 @@ class CoinNotFoundException(Exception):
 
     def __init__(self, symbol, exchange=None):
         self.symbol = symbol
+        self.exchange = exchange
         self.message = "Coin by name: {} was not found or no USDT pair available".format(symbol.upper())
         if exchange:
             self.message += " (on exchange {})".format(exchange)
         super().__init__(self.message)
 
+    def __reduce__(self):
+        return self.__class__, (self.symbol, self.exchange)
+
 class InvalidCoinException(Exception):
-    pass
\ No newline at end of file
+    pass
+
+
+class RateLimitedException(Exception):
+
+    def __init__(self, name, wait):
+        self.name = name
+        self.wait = wait
+        super().__init__("{} is rate limited for another {}s".format(name, round(wait, 1)))
+
+    def __reduce__(self):
+        return self.__class__, (self.name, self.wait)
\ No newline at end of file
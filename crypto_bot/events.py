@@ -0,0 +1,99 @@
+import logging
+import threading
+
+
+class PriceChange:
+
+    def __init__(self, symbol, old_price, new_price, old_perc, new_perc, exchange):
+        self.symbol = symbol
+        self.old_price = old_price
+        self.new_price = new_price
+        self.old_perc = old_perc
+        self.new_perc = new_perc
+        self.exchange = exchange
+
+    def __repr__(self):
+        return "PriceChange({}: {} -> {}, {}% -> {}% on {})".format(
+            self.symbol, self.old_price, self.new_price, self.old_perc, self.new_perc, self.exchange)
+
+
+class Subscription:
+
+    def __init__(self, bus, symbols, callback, loop=None):
+        self.bus = bus
+        self.symbols = set(symbols)
+        self.callback = callback
+        self.loop = loop
+
+    def deliver(self, change):
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self.callback, change)
+        else:
+            self.callback(change)
+
+    def cancel(self):
+        self.bus.unsubscribe(self)
+
+
+class PriceBus:
+
+    def __init__(self, price_threshold=0.01, perc_threshold=0.01):
+        self.price_threshold = price_threshold
+        self.perc_threshold = perc_threshold
+        self.subscriptions = {}
+        self.last = {}
+        self.lock = threading.Lock()
+        self.published = 0
+        self.suppressed = 0
+        self.logger = logging.getLogger("price bus")
+
+    def subscribe(self, symbols, callback, loop=None):
+        sub = Subscription(self, [s.lower() for s in symbols], callback, loop)
+        with self.lock:
+            for s in sub.symbols:
+                self.subscriptions.setdefault(s, set()).add(sub)
+        return sub
+
+    def unsubscribe(self, sub):
+        with self.lock:
+            for s in sub.symbols:
+                subs = self.subscriptions.get(s)
+                if subs:
+                    subs.discard(sub)
+                    if not subs:
+                        del self.subscriptions[s]
+
+    def significant(self, old_price, new_price, old_perc, new_perc):
+        if old_price is None:
+            return True
+        if old_price == 0:
+            return new_price != 0
+        if abs(new_price - old_price) / abs(old_price) * 100 >= self.price_threshold:
+            return True
+        if isinstance(old_perc, str) or isinstance(new_perc, str):
+            return old_perc != new_perc
+        return abs(new_perc - old_perc) >= self.perc_threshold
+
+    def publish(self, symbol, price, perc, exchange=None):
+        with self.lock:
+            old_price, old_perc = self.last.get(symbol, (None, None))
+            if not self.significant(old_price, price, old_perc, perc):
+                self.suppressed += 1
+                return None
+            self.last[symbol] = (price, perc)
+            self.published += 1
+            subs = list(self.subscriptions.get(symbol, ()))
+        change = PriceChange(symbol, old_price, price, old_perc, perc, exchange)
+        for sub in subs:
+            try:
+                sub.deliver(change)
+            except Exception as e:
+                self.logger.error("Failed delivering {}: {}".format(change, e))
+        return change
+
+    def stats(self):
+        return {
+            'published': self.published,
+            'suppressed': self.suppressed,
+            'symbols': len(self.subscriptions),
+        }
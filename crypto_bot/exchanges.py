@@ -1,16 +1,32 @@
+import asyncio
 import collections
+import collections.abc
+import copy
+import hashlib
+import json
 import logging
+import random
 import re
+import sys
 import threading
 import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from html.parser import HTMLParser
 from io import StringIO
 
-import requests
+import aiohttp
+import numpy as np
 
+from crypto_bot.cache import TTLCache, SingleFlight
 from crypto_bot.error import CoinNotFoundException
+from crypto_bot.http_client import get_client
+from crypto_bot.icon_cache import IconCache
+from crypto_bot.json_stream import JsonArrayStream, aiter_json_array
 from crypto_bot.price_indexer import Coin
+from crypto_bot.ratelimit import RequestScheduler
+from crypto_bot.ticker_store import TickerStore
 
 
 class Exchange:
@@ -18,21 +34,156 @@ class Exchange:
     def __init__(self, config):
         self.priority = int(config['priority'])
         self.coin_overrides = config.get("coin_overrides") or {}
+        self.http_config = config.get("http") or {}
+        self.update_rate = config.get('update_rate')
+        self.jitter = config.get('jitter', 0.1)
+        self.stream = bool(config.get('stream'))
+        self.stream_url = config.get('stream_url')
+        self.ping_interval = None
+        self.chunk_size = 64 * 1024
+        self.task = None
         self.name = None
+        self.base_url = config.get('base_url')
+        self._client = None
         self.coins = {}
+        self.store = TickerStore()
         self.logger = logging.getLogger("connector")
         self.ready = False
+        self.restored = False
         self.coins_path = None
         self.ticker_path = None
-        self.last_coin_list = set()
-        self.new_coins = {}
+        self.listings = ListingLog()
+        self.change_listeners = []
+        self.last_change = None
+        self.list_version = 0
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = get_client(self.name, self.base_url, self.http_config)
+        return self._client
 
     def call(self, url, method="GET", headers=None, data=None, json=True):
-        r = requests.request(method=method, url=url, data=data or {}, headers=headers or {})
-        if r.status_code is not 200:
-            raise requests.RequestException("{}: {}".format(r.status_code, r.content))
+        r = self.client.request(url, method=method, headers=headers, data=data)
         return r.json() if json else r.content
 
+    async def call_async(self, url, method="GET", headers=None, data=None, json=True):
+        return await self.client.request_async(url, method=method, headers=headers, data=data, json=json)
+
+    async def iter_array(self, url, key=None, predicate=None):
+        async with self.client.open_async(url) as r:
+            async for item in aiter_json_array(r.content.iter_chunked(self.chunk_size), key, predicate):
+                yield item
+
+    def pool_stats(self):
+        return self.client.stats()
+
+    def start(self, loop):
+        if self.task is None or self.task.done():
+            self.task = loop.create_task(self.poll())
+        return self.task
+
+    def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+        return self.task
+
+    async def poll(self):
+        while True:
+            try:
+                await self.update_listing()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.logger.error(e)
+            self.coins_ready()
+            if self.stream and self.ready:
+                try:
+                    await self.stream_tickers()
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    self.logger.warning("{} stream disconnected: {}".format(self.name, e))
+                self.logger.info("{} falling back to snapshot polling".format(self.name))
+            await asyncio.sleep(self.next_delay())
+
+    async def update_listing(self):
+        await self.get_coins()
+        self.restored = False
+
+    def next_delay(self):
+        return max(0, self.update_rate * (1 + random.uniform(-self.jitter, self.jitter)))
+
+    async def get_coins(self):
+        pass
+
+    async def stream_tickers(self):
+        url = await self.get_stream_url()
+        async with self.client.async_session().ws_connect(url, heartbeat=30) as ws:
+            self.logger.info("{} streaming tickers from {}".format(self.name, url))
+            await self.subscribe(ws)
+            pinger = asyncio.ensure_future(self.ping_stream(ws)) if self.ping_interval else None
+            try:
+                async for msg in ws:
+                    if msg.type == aiohttp.WSMsgType.TEXT:
+                        self.apply_stream_message(json.loads(msg.data))
+                    elif msg.type == aiohttp.WSMsgType.ERROR:
+                        raise ws.exception() or ConnectionError("Stream failed")
+            finally:
+                if pinger:
+                    pinger.cancel()
+        raise ConnectionError("Stream closed by server")
+
+    async def ping_stream(self, ws):
+        while not ws.closed:
+            await asyncio.sleep(self.ping_interval)
+            await ws.send_json(self.ping_message())
+
+    async def get_stream_url(self):
+        return self.stream_url
+
+    async def subscribe(self, ws):
+        pass
+
+    def ping_message(self):
+        pass
+
+    def apply_stream_message(self, msg):
+        pass
+
+    def parse_pair(self, pair):
+        pass
+
+    def add_pair(self, pair):
+        s = self.parse_pair(pair)
+        if not s:
+            return
+        s = sys.intern(s)
+        c = self.coins.get(s)
+        if c is None:
+            self.coins[s] = Coin(pair, symbol=s, exchange=self.name, store=self.store)
+            self.list_version += 1
+            # the first listing after a restore also contains everything listed while we were down
+            if self.ready and not self.restored:
+                self.listings.append(s)
+        elif c.coin_id != pair:
+            c.coin_id = pair
+        return s
+
+    def update_pair(self, pair, price, perc):
+        s = self.add_pair(pair)
+        if s:
+            self.coins[s].update(float(price), float(perc))
+
+    def apply_snapshot(self, pairs, prices, percs):
+        symbols = [self.add_pair(p) for p in pairs]
+        if None in symbols:
+            keep = [i for i, s in enumerate(symbols) if s]
+            symbols = [symbols[i] for i in keep]
+            prices = [prices[i] for i in keep]
+            percs = [percs[i] for i in keep]
+        self.store.apply_snapshot(symbols, prices, percs)
+
     def get_tickers(self, symbols):
 
         coins = {}
@@ -55,21 +206,33 @@ class Exchange:
         return c
 
     def coins_ready(self):
-        if not self.ready:
-            self.ready = True
-            self.last_coin_list = set(self.coins.keys())
-
-    def get_new_coins(self):
-        if not self.ready:
-            return set()
-        current_coins = set(self.coins.keys())
-        for n in (current_coins - self.last_coin_list):
-            self.new_coins[n] = datetime.utcnow()
-        self.last_coin_list = current_coins
-        return self.new_coins
-
-    def clear_new_coins(self):
-        self.new_coins = {}
+        self.ready = True
+
+    def overrides_digest(self):
+        return hashlib.sha1(json.dumps(self.coin_overrides, sort_keys=True).encode()).hexdigest()
+
+    def dump_state(self):
+        coins = list(self.coins.values())
+        rows = np.fromiter((c.row for c in coins), dtype=np.int64, count=len(coins))
+        return {
+            'symbols': np.array([c.symbol for c in coins], dtype=str),
+            'ids': np.array([str(c.coin_id) for c in coins], dtype=str),
+            'names': np.array([c.name or "" for c in coins], dtype=str),
+            'price': self.store.price[rows],
+            'perc': self.store.perc[rows],
+            'timestamp': self.store.timestamp[rows],
+            'overrides': self.overrides_digest(),
+        }
+
+    def load_state(self, state):
+        symbols = [sys.intern(s) for s in state['symbols'].tolist()]
+        for s, cid, name in zip(symbols, state['ids'].tolist(), state['names'].tolist()):
+            if s not in self.coins:
+                self.coins[s] = Coin(cid, s, name or None, exchange=self.name, store=self.store)
+        self.store.load(symbols, state['price'], state['perc'], state['timestamp'])
+        self.list_version += 1
+        self.restored = True
+        self.coins_ready()
 
     def get_ticker_range(self, coins):
         pass
@@ -80,14 +243,28 @@ class Exchange:
     def parse_ticker(self, d):
         pass
 
-    def parse_coins_response(self, resp) -> list:
+    def parse_coins_response(self, resp, parsed_coins=None) -> dict:
         pass
 
+    def add_change_listener(self, callback):
+        self.change_listeners.append(callback)
+
+    def publish_changes(self, change):
+        self.last_change = change
+        if not change:
+            return
+        self.logger.info("{} coin list changed: {}".format(self.name, change))
+        for callback in self.change_listeners:
+            try:
+                callback(self, change)
+            except Exception as e:
+                self.logger.error("Error publishing coin list changes: {}".format(e))
+
     @classmethod
-    def create(self, name, config):
+    def create(self, name, config, base_dir=None):
         name = name.lower()
         if name == "coingecko":
-            return CoinGeckoExchange(config)
+            return CoinGeckoExchange(config, base_dir)
         elif name == "kucoin":
             return KucoinExchange(config)
         elif name == "binance_us":
@@ -96,6 +273,53 @@ class Exchange:
             raise ValueError("Unknown exchange: {}".format(name))
 
 
+class CoinListChange:
+
+    def __init__(self, added=None, removed=None, renamed=None):
+        self.added = added or {}
+        self.removed = removed or {}
+        self.renamed = renamed or {}
+
+    def symbols(self):
+        symbols = set()
+        for entries in (self.added, self.removed):
+            symbols.update(e[0] for e in entries.values())
+        for old, new in self.renamed.values():
+            symbols.update((old[0], new[0]))
+        return symbols
+
+    def __bool__(self):
+        return bool(self.added or self.removed or self.renamed)
+
+    def __str__(self):
+        return "{} added, {} removed, {} renamed".format(len(self.added), len(self.removed), len(self.renamed))
+
+
+class ListingLog:
+
+    def __init__(self, max_size=1000):
+        self.generation = 0
+        self.entries = collections.deque(maxlen=max_size)
+        self.lock = threading.Lock()
+
+    def append(self, symbol, when=None):
+        with self.lock:
+            self.generation += 1
+            self.entries.append((self.generation, symbol, when or datetime.utcnow()))
+            return self.generation
+
+    def since(self, cursor):
+        # Also returns how many listings after the cursor already fell off the log
+        with self.lock:
+            entries = []
+            for e in reversed(self.entries):
+                if e[0] <= cursor:
+                    break
+                entries.append(e)
+            oldest = entries[-1][0] if entries else self.generation + 1
+            return self.generation, entries[::-1], max(0, oldest - cursor - 1)
+
+
 class MLStripper(HTMLParser):
     def __init__(self):
         super().__init__()
@@ -112,32 +336,151 @@ class MLStripper(HTMLParser):
 
 
 class CoinGeckoExchange(Exchange):
+    TICKER = "ticker"
+    INFO = "info"
+    COINS = "coins"
+    MARKET_FIELDS = ('total_coins', 'circulating_coins', 'market_cap', 'ath', 'ath_date')
 
-    def __init__(self, config):
+    def __init__(self, config, base_dir=None):
         super().__init__(config)
-        self.base_url = "https://api.coingecko.com/api/v3"
+        self.base_url = self.base_url or "https://api.coingecko.com/api/v3"
         self.coins_path = "/coins/list"
         self.coins_info_path = "/coins"
+        self.coins_info_query = "?localization=false&tickers=false&community_data=false&developer_data=false"
+        self.market_path = "/coins/markets?vs_currency=usd&ids={}"
         self.ticker_path = "/simple/price?ids={}&vs_currencies=usd&include_24hr_change=true"
         self.name = "CoinGecko"
-        threading.Thread(target=self.get_coins).start()
-
-    def get_coins(self):
-        while True:
-            try:
-                response = self.call(self.base_url + self.coins_path)
-                for coin in self.parse_coins_response(response):
-                    if coin.symbol in self.coin_overrides and coin.coin_id != self.coin_overrides[coin.symbol]:
-                        continue
-                    if coin.symbol not in self.coins:
-                        self.coins[coin.symbol] = coin
-                    else:
-                        self.coins[coin.symbol].coin_id = coin.coin_id
-                        self.coins[coin.symbol].name = coin.name
-            except Exception as e:
-                self.logger.error(e)
-            self.coins_ready()
-            time.sleep(650)
+        self.update_rate = config.get('update_rate', 650)
+
+        limits = config.get('rate_limit') or {}
+        self.max_url_length = limits.get('max_url_length', 2000)
+        self.scheduler = RequestScheduler(
+            self.name,
+            rate=limits.get('requests_per_minute', 30) / 60,
+            burst=limits.get('burst', 5),
+            lanes=(self.TICKER, self.INFO, self.COINS),
+            max_retries=limits.get('max_retries', 3)
+        )
+        self.executor = ThreadPoolExecutor(max_workers=limits.get('max_workers', 4),
+                                           thread_name_prefix="coingecko")
+
+        cache = config.get('info_cache') or {}
+        self.info_cache = TTLCache(cache.get('size', 512), cache.get('static_ttl', 6 * 3600))
+        self.market_cache = TTLCache(cache.get('size', 512), cache.get('market_ttl', 120))
+        self.info_flight = SingleFlight()
+
+        self.coin_list = {}
+        self.list_hash = None
+        self.list_etag = None
+        self.list_modified = None
+
+        self.icon_cache = IconCache.from_config(config.get('icon_cache'), base_dir)
+
+    def call(self, url, *args, lane=INFO, **kwargs):
+        return self.scheduler.call(lane, super().call, url, *args, **kwargs)
+
+    async def call_async(self, url, *args, lane=INFO, **kwargs):
+        return await self.scheduler.call_async(lane, super().call_async, url, *args, **kwargs)
+
+    async def get_coins(self):
+        response = await self.scheduler.call_async(self.COINS, self.fetch_coin_list)
+        if response is None:
+            self.logger.debug("{} coin list not modified".format(self.name))
+            return
+        digest, chunks, etag, modified = response
+        if digest != self.list_hash:
+            coin_list = self.parse_coin_list(chunks)
+            change = self.diff_coin_list(coin_list)
+            self.apply_coin_changes(coin_list, change)
+            self.coin_list = coin_list
+            self.list_hash = digest
+            self.publish_changes(change)
+        else:
+            self.logger.debug("{} coin list unchanged".format(self.name))
+        # only trust the validators once the body they describe has been read and parsed
+        self.list_etag = etag
+        self.list_modified = modified
+
+    async def fetch_coin_list(self):
+        headers = {}
+        if self.list_etag:
+            headers['If-None-Match'] = self.list_etag
+        if self.list_modified:
+            headers['If-Modified-Since'] = self.list_modified
+        async with self.client.open_async(self.base_url + self.coins_path, headers=headers,
+                                          statuses=(200, 304)) as r:
+            if r.status == 304:
+                return None
+            digest = hashlib.sha1()
+            chunks = []
+            async for chunk in r.content.iter_chunked(self.chunk_size):
+                digest.update(chunk)
+                chunks.append(chunk)
+            return digest.hexdigest(), chunks, r.headers.get('ETag'), r.headers.get('Last-Modified')
+
+    def parse_coin_list(self, chunks):
+        parser = JsonArrayStream()
+        coin_list = {}
+        for chunk in chunks:
+            self.parse_coins_response(parser.feed(chunk), coin_list)
+        parser.close()
+        return coin_list
+
+    def diff_coin_list(self, coin_list):
+        old = self.coin_list
+        change = CoinListChange()
+        for cid, entry in coin_list.items():
+            prev = old.get(cid)
+            if prev is None:
+                change.added[cid] = entry
+            elif prev != entry:
+                change.renamed[cid] = (prev, entry)
+        for cid, entry in old.items():
+            if cid not in coin_list:
+                change.removed[cid] = entry
+        return change
+
+    def apply_coin_changes(self, coin_list, change):
+        symbols = change.symbols()
+        if not symbols:
+            return
+        selected = {}
+        for cid, (symbol, name) in coin_list.items():
+            if symbol not in symbols:
+                continue
+            if symbol in self.coin_overrides and cid != self.coin_overrides[symbol]:
+                continue
+            selected[symbol] = (cid, name)
+        for symbol in symbols:
+            if symbol not in selected:
+                self.coins.pop(symbol, None)
+                continue
+            cid, name = selected[symbol]
+            if symbol not in self.coins:
+                self.coins[symbol] = Coin(cid, symbol, name, exchange=self.name, store=self.store)
+            else:
+                self.coins[symbol].coin_id = cid
+                self.coins[symbol].name = name
+        self.list_version += 1
+
+    def dump_state(self):
+        state = super().dump_state()
+        coin_list = list(self.coin_list.items())
+        state['list_ids'] = np.array([cid for cid, _ in coin_list], dtype=str)
+        state['list_symbols'] = np.array([e[0] for _, e in coin_list], dtype=str)
+        state['list_names'] = np.array([e[1] for _, e in coin_list], dtype=str)
+        state['list_hash'] = self.list_hash
+        state['list_etag'] = self.list_etag
+        state['list_modified'] = self.list_modified
+        return state
+
+    def load_state(self, state):
+        self.coin_list = {cid: (sys.intern(s), n) for cid, s, n in zip(
+            state['list_ids'].tolist(), state['list_symbols'].tolist(), state['list_names'].tolist())}
+        self.list_hash = state.get('list_hash')
+        self.list_etag = state.get('list_etag')
+        self.list_modified = state.get('list_modified')
+        super().load_state(state)
 
     def get_coin_info(self, symbol):
         symbol = symbol.lower()
@@ -145,7 +488,19 @@ class CoinGeckoExchange(Exchange):
             raise CoinNotFoundException(symbol)
 
         cid = self.coins[symbol].coin_id
-        info = self.call(self.base_url + "/{}/{}".format(self.coins_info_path, cid))
+        static = self.info_cache.get(cid)
+        if static is None:
+            info = self.info_flight.do(cid, self.fetch_coin_info, cid)
+        else:
+            market = self.market_cache.get(cid)
+            if market is None:
+                market = self.info_flight.do((self.MARKET_FIELDS, cid), self.fetch_market_data, cid)
+            info = dict(static, **market)
+        # coalesced callers and the caches share one dict, every caller gets its own copy
+        return copy.deepcopy(info)
+
+    def fetch_coin_info(self, cid):
+        info = self.call(self.base_url + "{}/{}{}".format(self.coins_info_path, cid, self.coins_info_query))
         info_dict = {
             'name': info.get('name'),
             'homepage': self.get_nested_key(info, ['links', 'homepage'])[0],
@@ -158,6 +513,7 @@ class CoinGeckoExchange(Exchange):
             'algorithm': info.get('hashing_algorithm'),
             'block_time': info.get('block_time_in_minutes'),
             'image': self.get_nested_key(info, ['image', 'small']),
+            'thumb': self.get_nested_key(info, ['image', 'thumb']),
         }
 
         entries = []
@@ -171,15 +527,39 @@ class CoinGeckoExchange(Exchange):
         if desc is not None:
             desc = self.strip_tags(desc)
         info_dict['description'] = desc
+        info_dict['ath_date'] = self.parse_date(self.get_nested_key(info, ['market_data', 'ath_date', 'usd']))
 
-        ath_date = self.get_nested_key(info, ['market_data', 'ath_date', 'usd'])
-        if ath_date is not None:
-            ath_date = datetime.strptime(ath_date, '%Y-%m-%dT%H:%M:%S.%fZ')
-        info_dict['ath_date'] = ath_date
+        self.market_cache.put(cid, {k: info_dict[k] for k in self.MARKET_FIELDS})
+        self.info_cache.put(cid, {k: v for k, v in info_dict.items() if k not in self.MARKET_FIELDS})
         return info_dict
 
-    def get_new_coins(self):
-        return {}
+    def fetch_market_data(self, cid):
+        markets = self.call(self.base_url + self.market_path.format(cid))
+        if not markets:
+            info = self.info_flight.do(cid, self.fetch_coin_info, cid)
+            return {k: info[k] for k in self.MARKET_FIELDS}
+        m = markets[0]
+        market = {
+            'total_coins': m.get('total_supply'),
+            'circulating_coins': m.get('circulating_supply'),
+            'market_cap': m.get('market_cap'),
+            'ath': m.get('ath'),
+            'ath_date': self.parse_date(m.get('ath_date')),
+        }
+        self.market_cache.put(cid, market)
+        return market
+
+    def parse_date(self, d):
+        if d is None:
+            return None
+        return datetime.strptime(d, '%Y-%m-%dT%H:%M:%S.%fZ')
+
+    def info_stats(self):
+        return {
+            'static': self.info_cache.stats(),
+            'market': self.market_cache.stats(),
+            'coalesced': self.info_flight.coalesced,
+        }
 
     def strip_tags(self, html):
         s = MLStripper()
@@ -188,14 +568,37 @@ class CoinGeckoExchange(Exchange):
 
     def get_nested_key(self, d, keys):
         for k in keys:
-            if d is None or not isinstance(d, collections.Mapping):
+            if d is None or not isinstance(d, collections.abc.Mapping):
                 break
             d = d.get(k)
         return d
 
+    def chunk_ids(self, ids):
+        limit = self.max_url_length - len(self.base_url + self.ticker_path.format(""))
+        chunk, size = [], 0
+        for i in ids:
+            if chunk and size + len(i) + 1 > limit:
+                yield chunk
+                chunk, size = [], 0
+            chunk.append(i)
+            size += len(i) + 1
+        if chunk:
+            yield chunk
+
+    def get_ticker_chunk(self, ids):
+        return self.call(self.base_url + self.ticker_path.format(",".join(ids)), lane=self.TICKER)
+
     def get_ticker_range(self, coins):
-        l = ",".join(coins.keys())
-        tickers = self.call(self.base_url + self.ticker_path.format(l))
+        futures = [self.executor.submit(self.get_ticker_chunk, c) for c in self.chunk_ids(coins.keys())]
+        tickers, error = {}, None
+        for f in futures:
+            try:
+                tickers.update(f.result())
+            except Exception as e:
+                self.logger.error("Failed fetching ticker chunk: {}".format(e))
+                error = e
+        if error and not tickers:
+            raise error
         return {coins[t].symbol: self.parse_ticker(d) for t, d in tickers.items()}
 
     def parse_ticker(self, d):
@@ -203,30 +606,30 @@ class CoinGeckoExchange(Exchange):
         perc = d['usd_24h_change']
         return price, perc
 
-    def parse_coins_response(self, resp):
-        if not isinstance(resp, list):
-            raise AssertionError("Response is not a list of coins")
-
-        parsed_coins = []
+    def parse_coins_response(self, resp, parsed_coins=None):
+        parsed_coins = {} if parsed_coins is None else parsed_coins
         for c in resp:
             try:
-                parsed_coins.append(Coin(c['id'], c['symbol'], c['name'], exchange=self.name))
+                parsed_coins[c['id']] = (sys.intern(c['symbol'].lower()), c['name'])
             except Exception as e:
                 self.logger.error(e)
         return parsed_coins
 
     def get_icon(self, symbol):
-        path = "/coins/{}"
         c = self.coins.get(symbol.lower())
         if not c:
             raise AssertionError("Coin by name: {} was not found".format(symbol))
-        r = self.call(self.base_url + path.format(c.coin_id))
-        if 'image' in r:
+        image = self.icon_cache.get(c.coin_id)
+        if image:
+            return image
+        info = self.info_cache.get(c.coin_id) or self.info_flight.do(c.coin_id, self.fetch_coin_info, c.coin_id)
+        url = info.get('thumb')
+        if url:
             try:
-                url = r['image']['thumb']
-                image = self.call(url, headers={'Accept': 'image/png'}, json=False)
+                image = self.client.request(url, headers={'Accept': 'image/png'}).content
                 if not image:
                     raise AssertionError("No image data was returned")
+                self.icon_cache.put(c.coin_id, image)
                 return image
             except Exception as e:
                 raise AssertionError("Failed retrieving the image for icon for symbol {} due to: {}".format(symbol, e))
@@ -236,33 +639,56 @@ class KucoinExchange(Exchange):
 
     def __init__(self, config):
         super().__init__(config)
-        self.base_url = "https://api.kucoin.com"
+        self.base_url = self.base_url or "https://api.kucoin.com"
         self.coins_path = "/api/v1/market/allTickers"
-        self.update_rate = config['update_rate']
+        self.token_path = "/api/v1/bullet-public"
+        self.stream_topic = "/market/snapshot:USDS"
         self.name = "KuCoin"
-        threading.Thread(target=self.get_coins).start()
 
-    def get_coins(self):
-        while True:
-            try:
-                response = self.call(self.base_url + self.coins_path)
-                for coin in response['data']['ticker']:
-                    s = coin['symbol'].lower()
-                    if 'usdt' not in s:
-                        continue
-                    s = s.split('-')[0]
-                    if s not in self.coins:
-                        self.coins[s] = Coin(coin['symbol'], symbol=s, exchange=self.name)
-                    else:
-                        self.coins[s].coin_id = coin['symbol']
-                    self.coins[s].update(float(coin['last']), float(coin['changeRate']))
-            except Exception as e:
-                self.logger.error(e)
-            self.coins_ready()
-            with open('coins.txt', 'w') as f:
-                for k in sorted(self.coins):
-                    f.write('KUCOIN:' + k.upper() + 'USDT,')
-            time.sleep(self.update_rate)
+    async def get_coins(self):
+        pairs = self.iter_array(self.base_url + self.coins_path, key='ticker',
+                                predicate=lambda c: self.parse_pair(c['symbol']))
+        symbols, prices, percs = [], [], []
+        async for coin in pairs:
+            symbols.append(coin['symbol'])
+            prices.append(coin['last'])
+            percs.append(coin['changeRate'])
+        self.apply_snapshot(symbols, prices, percs)
+        with open('coins.txt', 'w') as f:
+            for k in sorted(self.coins):
+                f.write('KUCOIN:' + k.upper() + 'USDT,')
+
+    def parse_pair(self, pair):
+        s = pair.lower()
+        if 'usdt' not in s:
+            return
+        return s.split('-')[0]
+
+    async def get_stream_url(self):
+        if self.stream_url:
+            return self.stream_url
+        response = await self.call_async(self.base_url + self.token_path, method="POST")
+        server = response['data']['instanceServers'][0]
+        self.ping_interval = server.get('pingInterval', 18000) / 1000
+        return "{}?token={}&connectId={}".format(server['endpoint'], response['data']['token'], uuid.uuid4().hex)
+
+    async def subscribe(self, ws):
+        await ws.send_json({
+            'id': str(int(time.time() * 1000)),
+            'type': 'subscribe',
+            'topic': self.stream_topic,
+            'privateChannel': False,
+            'response': True
+        })
+
+    def ping_message(self):
+        return {'id': str(int(time.time() * 1000)), 'type': 'ping'}
+
+    def apply_stream_message(self, msg):
+        if msg.get('type') != 'message':
+            return
+        d = msg['data'].get('data') or msg['data']
+        self.update_pair(d['symbol'], d['lastTradedPrice'], d['changeRate'])
 
     def get_ticker_range(self, symbols):
         return {v.symbol: (v.price, v.perc) for v in symbols.values()}
@@ -272,30 +698,30 @@ class BinanceUSExchange(Exchange):
 
     def __init__(self, config):
         super().__init__(config)
-        self.base_url = "https://api.binance.us"
+        self.base_url = self.base_url or "https://api.binance.us"
+        self.stream_url = self.stream_url or "wss://stream.binance.us:9443/ws/!ticker@arr"
         self.coins_path = "/api/v3/ticker/24hr"
-        self.update_rate = config['update_rate']
         self.name = "Binance US"
-        threading.Thread(target=self.get_coins).start()
 
-    def get_coins(self):
-        while True:
-            try:
-                response = self.call(self.base_url + self.coins_path)
-                for coin in response:
-                    s = coin['symbol'].lower()
-                    if not s.endswith('usd'):
-                        continue
-                    s = re.sub('usd$', '', s)
-                    if s not in self.coins:
-                        self.coins[s] = Coin(coin['symbol'], symbol=s, exchange=self.name)
-                    else:
-                        self.coins[s].coin_id = coin['symbol']
-                    self.coins[s].update(float(coin['lastPrice']), float(coin['priceChangePercent']))
-            except Exception as e:
-                self.logger.error(e)
-            self.coins_ready()
-            time.sleep(self.update_rate)
+    async def get_coins(self):
+        pairs = self.iter_array(self.base_url + self.coins_path,
+                                predicate=lambda c: self.parse_pair(c['symbol']))
+        symbols, prices, percs = [], [], []
+        async for coin in pairs:
+            symbols.append(coin['symbol'])
+            prices.append(coin['lastPrice'])
+            percs.append(coin['priceChangePercent'])
+        self.apply_snapshot(symbols, prices, percs)
+
+    def parse_pair(self, pair):
+        s = pair.lower()
+        if not s.endswith('usd'):
+            return
+        return re.sub('usd$', '', s)
+
+    def apply_stream_message(self, msg):
+        for t in msg if isinstance(msg, list) else [msg]:
+            self.update_pair(t['s'], t['c'], t['P'])
 
     def get_ticker_range(self, symbols):
         return {v.symbol: (v.price, v.perc) for v in symbols.values()}
@@ -0,0 +1,130 @@
+import re
+import threading
+import time
+
+import numpy as np
+
+DEFAULT_TIERS = [
+    {'resolution': 1, 'capacity': 3600},
+    {'resolution': 60, 'capacity': 1440},
+    {'resolution': 900, 'capacity': 2880},
+]
+
+SPARKS = "▁▂▃▄▅▆▇█"
+UNITS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400, 'w': 604800}
+
+
+def parse_window(text):
+    m = re.fullmatch(r'(\d+(?:\.\d+)?)([smhdw]?)', str(text).strip().lower())
+    if not m or not float(m.group(1)):
+        raise ValueError("Invalid window '{}' - use e.g. 30m, 4h, 7d".format(text))
+    return float(m.group(1)) * UNITS[m.group(2) or 's']
+
+
+class RingBuffer:
+
+    def __init__(self, resolution, capacity):
+        self.resolution = resolution
+        self.capacity = capacity
+        self.ts = np.zeros(capacity, dtype=np.float64)
+        self.price = np.zeros(capacity, dtype=np.float64)
+        self.head = 0
+        self.count = 0
+
+    @property
+    def span(self):
+        return self.resolution * self.capacity
+
+    def add(self, ts, price):
+        bucket = ts - ts % self.resolution
+        last = (self.head - 1) % self.capacity
+        if self.count and self.ts[last] == bucket:
+            self.price[last] = price
+            return
+        self.ts[self.head] = bucket
+        self.price[self.head] = price
+        self.head = (self.head + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+
+    def ordered(self):
+        if self.count < self.capacity:
+            return self.ts[:self.count], self.price[:self.count]
+        return np.roll(self.ts, -self.head), np.roll(self.price, -self.head)
+
+    def window(self, start, end):
+        ts, price = self.ordered()
+        mask = (ts >= start) & (ts <= end)
+        return ts[mask], price[mask]
+
+
+class PriceHistory:
+
+    def __init__(self, tiers=None):
+        self.tiers = [RingBuffer(t['resolution'], t['capacity']) for t in (tiers or DEFAULT_TIERS)]
+
+    def add(self, ts, price):
+        for t in self.tiers:
+            t.add(ts, price)
+
+    def tier_for(self, seconds):
+        for t in self.tiers:
+            if t.span >= seconds:
+                return t
+        return self.tiers[-1]
+
+    def window(self, seconds, now=None):
+        now = now or time.time()
+        return self.tier_for(seconds).window(now - seconds, now)
+
+
+class HistoryStore:
+
+    def __init__(self, tiers=None):
+        self.tiers = tiers
+        self.histories = {}
+        self.lock = threading.Lock()
+
+    def record(self, symbol, price, ts=None):
+        if not price or price != price:
+            return
+        with self.lock:
+            h = self.histories.get(symbol)
+            if h is None:
+                h = self.histories[symbol] = PriceHistory(self.tiers)
+            h.add(ts or time.time(), price)
+
+    def range(self, symbol, seconds, now=None):
+        with self.lock:
+            h = self.histories.get(symbol.lower())
+            if h is None:
+                return np.zeros(0), np.zeros(0)
+            ts, price = h.window(seconds, now)
+            return ts.copy(), price.copy()
+
+    def stats(self, symbol, seconds, now=None):
+        ts, price = self.range(symbol, seconds, now)
+        if not len(price):
+            return None
+        first, last = float(price[0]), float(price[-1])
+        return {
+            'min': float(price.min()),
+            'max': float(price.max()),
+            'first': first,
+            'last': last,
+            'change': last - first,
+            'change_perc': (last - first) / first * 100 if first else 0,
+            'start': float(ts[0]),
+            'samples': len(price),
+        }
+
+    def sparkline(self, symbol, seconds, width=30, now=None):
+        ts, price = self.range(symbol, seconds, now)
+        if not len(price):
+            return None
+        if len(price) > width:
+            price = np.array([c[-1] for c in np.array_split(price, width)])
+        low, high = price.min(), price.max()
+        if high == low:
+            return SPARKS[len(SPARKS) // 2] * len(price)
+        idx = ((price - low) / (high - low) * (len(SPARKS) - 1)).round().astype(int)
+        return "".join(SPARKS[i] for i in idx)
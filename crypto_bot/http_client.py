@@ -0,0 +1,174 @@
+import contextlib
+import logging
+import threading
+import time
+
+import aiohttp
+import requests
+from requests.adapters import HTTPAdapter
+
+from crypto_bot import metrics
+
+REQUEST_SECONDS = metrics.histogram('crypto_bot_exchange_request_seconds',
+                                    'Exchange API request latency', ('exchange',))
+REQUEST_ERRORS = metrics.counter('crypto_bot_exchange_request_errors_total',
+                                 'Failed exchange API requests', ('exchange',))
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+class HttpClient:
+
+    def __init__(self, name, base_url=None, pool_connections=4, pool_size=10, host_pool_sizes=None,
+                 connect_timeout=5, read_timeout=30):
+        self.name = name
+        self.timeout = (connect_timeout, read_timeout)
+        self.pool_size = max([pool_size] + list((host_pool_sizes or {}).values()))
+        self.headers = {
+            'Accept-Encoding': 'gzip, deflate',
+            'Connection': 'keep-alive',
+        }
+        self.logger = logging.getLogger("http")
+        self.request_count = 0
+        self.error_count = 0
+        self.lock = threading.Lock()
+
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        self._async_session = None
+
+        self.adapters = {}
+        self.mount("https://", pool_connections, pool_size)
+        self.mount("http://", pool_connections, pool_size)
+        if base_url:
+            self.mount(base_url, 1, pool_size)
+        for host, size in (host_pool_sizes or {}).items():
+            self.mount(host, 1, size)
+
+    def mount(self, prefix, pool_connections, pool_size):
+        adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_size)
+        self.session.mount(prefix, adapter)
+        self.adapters[prefix] = adapter
+
+    def count(self, error=False):
+        with self.lock:
+            if error:
+                self.error_count += 1
+            else:
+                self.request_count += 1
+
+    def request(self, url, method="GET", headers=None, data=None, stream=False):
+        self.count()
+        start = time.monotonic()
+        try:
+            r = self.session.request(method=method, url=url, data=data or {}, headers=headers or {},
+                                     timeout=self.timeout, stream=stream)
+            if r.status_code != 200:
+                self.count(error=True)
+                raise HttpStatusError(r.status_code, r.content, r.headers, response=r)
+            return r
+        except Exception:
+            REQUEST_ERRORS.inc(exchange=self.name)
+            raise
+        finally:
+            REQUEST_SECONDS.observe(time.monotonic() - start, exchange=self.name)
+
+    def async_session(self):
+        if self._async_session is None or self._async_session.closed:
+            connector = aiohttp.TCPConnector(limit=self.pool_size * 2, limit_per_host=self.pool_size)
+            timeout = aiohttp.ClientTimeout(sock_connect=self.timeout[0], sock_read=self.timeout[1])
+            self._async_session = aiohttp.ClientSession(
+                connector=connector, timeout=timeout, headers=self.headers)
+        return self._async_session
+
+    @contextlib.asynccontextmanager
+    async def open_async(self, url, method="GET", headers=None, data=None, statuses=(200,)):
+        self.count()
+        start = time.monotonic()
+        try:
+            async with self.async_session().request(method, url, headers=headers or {}, data=data) as r:
+                if r.status not in statuses:
+                    self.count(error=True)
+                    raise HttpStatusError(r.status, await r.read(), r.headers)
+                yield r
+        except Exception:
+            REQUEST_ERRORS.inc(exchange=self.name)
+            raise
+        finally:
+            REQUEST_SECONDS.observe(time.monotonic() - start, exchange=self.name)
+
+    async def request_async(self, url, method="GET", headers=None, data=None, json=True):
+        async with self.open_async(url, method=method, headers=headers, data=data) as r:
+            return await r.json(content_type=None) if json else await r.read()
+
+    def stats(self):
+        pools = {}
+        for prefix, adapter in self.adapters.items():
+            manager = adapter.poolmanager
+            for key in list(manager.pools.keys()):
+                pool = manager.pools.get(key)
+                if pool is None:
+                    continue
+                pools["{}://{}:{}".format(pool.scheme, pool.host, pool.port)] = {
+                    'connections': pool.num_connections,
+                    'requests': pool.num_requests,
+                    'idle': len([c for c in list(pool.pool.queue) if c]) if pool.pool else 0,
+                    'max_size': manager.connection_pool_kw.get('maxsize'),
+                }
+        return {
+            'requests': self.request_count,
+            'errors': self.error_count,
+            'pools': pools,
+        }
+
+    def close(self):
+        self.session.close()
+
+    async def close_async(self):
+        if self._async_session is not None:
+            await self._async_session.close()
+        self.close()
+
+
+class HttpStatusError(requests.HTTPError):
+
+    def __init__(self, status, content, headers, response=None):
+        self.status = status
+        self.headers = headers or {}
+        super().__init__("{}: {}".format(status, content), response=response)
+
+
+def get_client(name, base_url=None, config=None):
+    config = config or {}
+    with _clients_lock:
+        if name not in _clients:
+            _clients[name] = HttpClient(
+                name,
+                base_url=base_url,
+                pool_size=config.get('pool_size', 10),
+                host_pool_sizes=config.get('host_pool_sizes'),
+                connect_timeout=config.get('connect_timeout', 5),
+                read_timeout=config.get('read_timeout', 30),
+            )
+        return _clients[name]
+
+
+def pool_stats():
+    with _clients_lock:
+        return {n: c.stats() for n, c in _clients.items()}
+
+
+def close_all():
+    with _clients_lock:
+        for c in _clients.values():
+            c.close()
+        _clients.clear()
+
+
+async def close_all_async():
+    with _clients_lock:
+        clients = list(_clients.values())
+        _clients.clear()
+    for c in clients:
+        await c.close_async()
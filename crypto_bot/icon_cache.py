@@ -0,0 +1,112 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+
+class IconCache:
+
+    def __init__(self, path="cache/icons", max_bytes=50 * 1024 * 1024, ttl=7 * 86400):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.index_path = os.path.join(path, "index.json")
+        self.lock = threading.Lock()
+        self.logger = logging.getLogger("icon cache")
+        self.index = self.load_index()
+
+    @classmethod
+    def from_config(cls, config, base_dir=None):
+        config = config or {}
+        path = config.get('path', "cache/icons")
+        if base_dir and not os.path.isabs(path):
+            path = os.path.join(base_dir, path)
+        return cls(path, config.get('max_bytes', 50 * 1024 * 1024), config.get('ttl', 7 * 86400))
+
+    @staticmethod
+    def hash(data):
+        return hashlib.sha256(data).hexdigest()
+
+    def load_index(self):
+        try:
+            with open(self.index_path) as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            index = {}
+        index.setdefault('coins', {})
+        index.setdefault('avatars', {})
+        return index
+
+    def save_index(self):
+        os.makedirs(self.path, exist_ok=True)
+        tmp = self.index_path + ".tmp"
+        with open(tmp, 'w') as f:
+            json.dump(self.index, f)
+        os.replace(tmp, self.index_path)
+
+    def blob_path(self, digest):
+        return os.path.join(self.path, digest + ".png")
+
+    def get(self, coin_id):
+        with self.lock:
+            entry = self.index['coins'].get(coin_id)
+            if not entry or time.time() - entry['fetched'] > self.ttl:
+                return None
+            path = self.blob_path(entry['hash'])
+            try:
+                with open(path, 'rb') as f:
+                    data = f.read()
+                os.utime(path)
+                return data
+            except OSError:
+                self.index['coins'].pop(coin_id, None)
+                return None
+
+    def put(self, coin_id, data):
+        digest = self.hash(data)
+        with self.lock:
+            path = self.blob_path(digest)
+            if not os.path.exists(path):
+                os.makedirs(self.path, exist_ok=True)
+                tmp = path + ".tmp"
+                with open(tmp, 'wb') as f:
+                    f.write(data)
+                os.replace(tmp, path)
+            self.index['coins'][coin_id] = {'hash': digest, 'fetched': time.time()}
+            self.evict()
+            self.save_index()
+        return digest
+
+    def evict(self):
+        blobs = []
+        for name in os.listdir(self.path):
+            if name.endswith(".png"):
+                p = os.path.join(self.path, name)
+                st = os.stat(p)
+                blobs.append((st.st_mtime, st.st_size, name[:-4]))
+        total = sum(b[1] for b in blobs)
+        for _, size, digest in sorted(blobs):
+            if total <= self.max_bytes:
+                break
+            os.remove(self.blob_path(digest))
+            total -= size
+            for cid in [c for c, e in self.index['coins'].items() if e['hash'] == digest]:
+                del self.index['coins'][cid]
+            self.logger.debug("Evicted icon {}".format(digest))
+
+    def avatar_hash(self, key):
+        with self.lock:
+            return self.index['avatars'].get(str(key))
+
+    def set_avatar_hash(self, key, digest):
+        with self.lock:
+            self.index['avatars'][str(key)] = digest
+            self.save_index()
+
+    def avatar_changed(self, key, data):
+        return self.avatar_hash(key) != self.hash(data)
+
+    def set_avatar(self, key, data):
+        self.set_avatar_hash(key, self.hash(data))
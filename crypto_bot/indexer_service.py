@@ -0,0 +1,218 @@
+import logging
+import threading
+import time
+from multiprocessing.managers import BaseManager
+
+from crypto_bot.events import PriceBus
+from crypto_bot.icon_cache import IconCache
+from crypto_bot.price_indexer import Coin
+from crypto_bot.quotes import PriceSnapshot, Quote, SnapshotPublisher
+
+
+class IndexerManager(BaseManager):
+    pass
+
+
+class IndexerClientManager(BaseManager):
+    pass
+
+
+IndexerClientManager.register('indexer')
+
+
+class IndexerService:
+
+    def __init__(self, indexer):
+        self.indexer = indexer
+
+    def ready(self):
+        return self.indexer.running
+
+    def coin(self, symbol, wait=False, info=False):
+        c = self.indexer.get_coin(symbol, wait=wait, info=info)
+        return {'coin_id': c.coin_id, 'symbol': c.symbol, 'name': c.name, 'info': dict(c.info) if info else None}
+
+    def quote(self, symbol):
+        q = self.indexer.get_quote(symbol)
+        return tuple(q) if q else None
+
+    def icon(self, symbol):
+        return self.indexer.get_icon(symbol)
+
+    def avatar_hash(self, key):
+        cache = self.indexer.icon_cache
+        return cache.avatar_hash(key) if cache else None
+
+    def set_avatar_hash(self, key, digest):
+        cache = self.indexer.icon_cache
+        if cache:
+            cache.set_avatar_hash(key, digest)
+
+    def route(self, symbol):
+        return self.indexer.get_route(symbol)
+
+    def history_stats(self, symbol, seconds):
+        return self.indexer.history.stats(symbol, seconds)
+
+    def history_sparkline(self, symbol, seconds, width=30):
+        return self.indexer.history.sparkline(symbol, seconds, width)
+
+    def listing_cursors(self):
+        return self.indexer.listing_cursors()
+
+    def new_coins_since(self, cursors):
+        cursors = dict(cursors)
+        new_coins = self.indexer.new_coins_since(cursors)
+        return cursors, new_coins
+
+
+def serve_indexer(indexer, address, authkey):
+    service = IndexerService(indexer)
+    IndexerManager.register('indexer', callable=lambda: service)
+    server = IndexerManager(address=address, authkey=authkey).get_server()
+    threading.Thread(target=server.serve_forever, name="indexer service", daemon=True).start()
+    return server
+
+
+class RemoteHistory:
+
+    def __init__(self, client):
+        self.client = client
+
+    def stats(self, symbol, seconds):
+        return self.client.call('history_stats', symbol, seconds)
+
+    def sparkline(self, symbol, seconds, width=30):
+        return self.client.call('history_sparkline', symbol, seconds, width)
+
+
+class RemoteIconCache:
+
+    def __init__(self, client):
+        self.client = client
+
+    def avatar_changed(self, key, data):
+        return self.client.call('avatar_hash', key) != IconCache.hash(data)
+
+    def set_avatar(self, key, data):
+        self.client.call('set_avatar_hash', key, IconCache.hash(data))
+
+
+class IndexerClient:
+
+    def __init__(self, address, authkey, table, change_threshold=None, sync_interval=0.5):
+        self.address = address
+        self.authkey = authkey
+        self.table = table
+        self.sync_interval = sync_interval
+        change_threshold = change_threshold or {}
+        self.bus = PriceBus(change_threshold.get('price', 0.01), change_threshold.get('perc', 0.01))
+        self.prices = SnapshotPublisher()
+        self.history = RemoteHistory(self)
+        self.coins = {}
+        self.remote = {}
+        self.icon_cache = RemoteIconCache(self)
+        self.running = False
+        self.local = threading.local()
+        self.logger = logging.getLogger("indexer client")
+
+    def service(self):
+        s = getattr(self.local, 'service', None)
+        if s is None:
+            manager = IndexerClientManager(address=self.address, authkey=self.authkey)
+            manager.connect()
+            s = self.local.service = manager.indexer()
+        return s
+
+    def call(self, name, *args):
+        try:
+            return getattr(self.service(), name)(*args)
+        except (ConnectionError, EOFError, OSError):
+            self.local.service = None
+            raise
+
+    def wait_ready(self, timeout=300):
+        end = time.monotonic() + timeout
+        while time.monotonic() < end:
+            try:
+                if self.call('ready'):
+                    return True
+            except (ConnectionError, EOFError, OSError):
+                pass
+            time.sleep(0.5)
+        return False
+
+    def get_coin(self, symbol, wait=False, info=False):
+        d = self.call('coin', symbol, wait, info)
+        coin = self.coins.get(d['symbol'])
+        if coin is None or coin.coin_id != d['coin_id']:
+            coin = self.coins[d['symbol']] = Coin(d['coin_id'], d['symbol'], d['name'])
+        coin.name = d['name']
+        if info:
+            coin.info = d['info']
+        return coin
+
+    def get_quote(self, symbol):
+        symbol = symbol.lower()
+        if self.table.fits(symbol):
+            return self.table.get(symbol)
+        # too long for the shared table or it is full, ask the indexer and keep polling it in sync
+        q = self.remote_quote(symbol)
+        self.remote[symbol] = q
+        return q
+
+    def remote_quote(self, symbol):
+        q = self.call('quote', symbol)
+        return Quote(*q) if q else None
+
+    def price_snapshot(self):
+        return self.prices.current
+
+    def get_icon(self, symbol):
+        return self.call('icon', symbol)
+
+    def get_route(self, symbol):
+        return self.call('route', symbol)
+
+    def listing_cursors(self):
+        return self.call('listing_cursors')
+
+    def new_coins_since(self, cursors):
+        new_cursors, new_coins = self.call('new_coins_since', cursors)
+        cursors.update(new_cursors)
+        return new_coins
+
+    def run(self):
+        self.running = True
+        threading.Thread(target=self.sync_loop, name="indexer sync", daemon=True).start()
+
+    def stop(self):
+        self.running = False
+
+    def stop_exchanges(self):
+        return []
+
+    def sync_loop(self):
+        while self.running:
+            try:
+                self.sync()
+            except Exception as e:
+                self.logger.warning("Price sync failed: {}".format(e))
+            time.sleep(self.sync_interval)
+
+    def sync(self):
+        for s, old in list(self.remote.items()):
+            q = self.remote_quote(s)
+            if q != old:
+                self.remote[s] = q
+                if q:
+                    self.bus.publish(s, q.price, q.perc, q.exchange)
+        version = self.table.version
+        old = self.prices.current
+        if version == old.version:
+            return
+        quotes = self.table.read_all()
+        self.prices.current = PriceSnapshot(version, quotes)
+        for s, q in quotes.items():
+            if old.quotes.get(s) != q:
+                self.bus.publish(s, q.price, q.perc, q.exchange)
@@ -0,0 +1,88 @@
+import codecs
+import json
+import re
+
+WHITESPACE = " \t\n\r"
+DELIMITERS = WHITESPACE + ",]"
+
+
+class JsonArrayStream:
+
+    def __init__(self, key=None, predicate=None):
+        self.start = re.compile(r'"{}"\s*:\s*\['.format(re.escape(key))) if key else None
+        self.predicate = predicate
+        self.decoder = json.JSONDecoder()
+        self.text = codecs.getincrementaldecoder("utf-8")()
+        self.buffer = ""
+        self.started = False
+        self.done = False
+        self.count = 0
+
+    def find_start(self):
+        if self.start is None:
+            stripped = self.buffer.lstrip(WHITESPACE)
+            if not stripped:
+                return False
+            if stripped[0] != "[":
+                raise ValueError("Response is not a JSON array")
+            self.buffer = stripped[1:]
+            return True
+        m = self.start.search(self.buffer)
+        if not m:
+            return False
+        self.buffer = self.buffer[m.end():]
+        return True
+
+    def feed(self, chunk):
+        items = []
+        if self.done:
+            return items
+        self.buffer += self.text.decode(chunk) if isinstance(chunk, bytes) else chunk
+        if not self.started:
+            self.started = self.find_start()
+            if not self.started:
+                return items
+
+        buf, pos, end = self.buffer, 0, len(self.buffer)
+        while pos < end:
+            c = buf[pos]
+            if c in WHITESPACE or c == ",":
+                pos += 1
+                continue
+            if c == "]":
+                self.done = True
+                break
+            try:
+                item, nxt = self.decoder.raw_decode(buf, pos)
+            except ValueError:
+                break
+            if nxt >= end:
+                break
+            # numbers and literals only end at a delimiter, the rest may still be in the next chunk
+            if c not in '{["' and buf[nxt] not in DELIMITERS:
+                break
+            pos = nxt
+            self.count += 1
+            if self.predicate is None or self.predicate(item):
+                items.append(item)
+        self.buffer = buf[pos:]
+        return items
+
+    def close(self):
+        if not self.done:
+            raise ValueError("JSON array was not terminated")
+
+
+def iter_json_array(chunks, key=None, predicate=None):
+    parser = JsonArrayStream(key, predicate)
+    for chunk in chunks:
+        yield from parser.feed(chunk)
+    parser.close()
+
+
+async def aiter_json_array(chunks, key=None, predicate=None):
+    parser = JsonArrayStream(key, predicate)
+    async for chunk in chunks:
+        for item in parser.feed(chunk):
+            yield item
+    parser.close()
@@ -0,0 +1,210 @@
+import bisect
+import contextlib
+import logging
+import math
+import threading
+import time
+
+from flask import Flask, Response
+from werkzeug.serving import make_server
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+def format_value(v):
+    if v == math.inf:
+        return "+Inf"
+    if isinstance(v, float) and v.is_integer():
+        return str(int(v))
+    return str(v)
+
+
+def escape(v):
+    return str(v).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+class Metric:
+    type = None
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def key(self, labels):
+        if set(labels) != set(self.labels):
+            raise ValueError("Metric {} expects labels {}, got {}".format(self.name, self.labels, tuple(labels)))
+        return tuple(str(labels[l]) for l in self.labels)
+
+    def label_text(self, key, extra=None):
+        pairs = list(zip(self.labels, key)) + (extra or [])
+        if not pairs:
+            return ""
+        return "{" + ",".join('{}="{}"'.format(k, escape(v)) for k, v in pairs) + "}"
+
+    def clear(self):
+        with self.lock:
+            self.values.clear()
+
+    def render(self):
+        lines = ["# HELP {} {}".format(self.name, self.help), "# TYPE {} {}".format(self.name, self.type)]
+        with self.lock:
+            items = sorted(self.values.items())
+        for key, value in items:
+            lines.extend(self.render_sample(key, value))
+        return lines
+
+    def render_sample(self, key, value):
+        return ["{}{} {}".format(self.name, self.label_text(key), format_value(value))]
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self.key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    type = "gauge"
+
+    def set(self, value, **labels):
+        key = self.key(labels)
+        with self.lock:
+            self.values[key] = value
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self.key(labels)
+        i = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            entry = self.values.get(key)
+            if entry is None:
+                entry = self.values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][i] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    @contextlib.contextmanager
+    def time(self, **labels):
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.observe(time.monotonic() - start, **labels)
+
+    def render_sample(self, key, value):
+        counts, total, count = value
+        lines = []
+        cumulative = 0
+        for le, c in zip(self.buckets + (math.inf,), counts):
+            cumulative += c
+            lines.append("{}_bucket{} {}".format(
+                self.name, self.label_text(key, [('le', format_value(float(le)))]), cumulative))
+        lines.append("{}_sum{} {}".format(self.name, self.label_text(key), format_value(total)))
+        lines.append("{}_count{} {}".format(self.name, self.label_text(key), count))
+        return lines
+
+
+class Registry:
+
+    def __init__(self):
+        self.metrics = {}
+        self.collectors = []
+        self.lock = threading.Lock()
+        self.logger = logging.getLogger("metrics")
+
+    def register(self, cls, name, help, labels=(), **kwargs):
+        with self.lock:
+            m = self.metrics.get(name)
+            if m is None:
+                m = self.metrics[name] = cls(name, help, labels, **kwargs)
+            elif not isinstance(m, cls) or m.labels != tuple(labels):
+                raise ValueError("Metric {} already registered with a different type or labels".format(name))
+            return m
+
+    def counter(self, name, help, labels=()):
+        return self.register(Counter, name, help, labels)
+
+    def gauge(self, name, help, labels=()):
+        return self.register(Gauge, name, help, labels)
+
+    def histogram(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram, name, help, labels, buckets=buckets)
+
+    def add_collector(self, callback):
+        with self.lock:
+            if callback not in self.collectors:
+                self.collectors.append(callback)
+
+    def remove_collector(self, callback):
+        with self.lock:
+            if callback in self.collectors:
+                self.collectors.remove(callback)
+
+    def render(self):
+        with self.lock:
+            collectors = list(self.collectors)
+        for callback in collectors:
+            try:
+                callback()
+            except Exception as e:
+                self.logger.error("Metrics collector failed: {}".format(e))
+        lines = []
+        with self.lock:
+            metrics = [self.metrics[n] for n in sorted(self.metrics)]
+        for m in metrics:
+            lines.extend(m.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+counter = REGISTRY.counter
+gauge = REGISTRY.gauge
+histogram = REGISTRY.histogram
+add_collector = REGISTRY.add_collector
+remove_collector = REGISTRY.remove_collector
+
+
+class MetricsServer:
+
+    def __init__(self, host="127.0.0.1", port=9100, path="/metrics", registry=REGISTRY):
+        self.host = host
+        self.port = port
+        self.path = path
+        self.registry = registry
+        self.server = None
+        self.logger = logging.getLogger("metrics")
+
+    def create_app(self):
+        app = Flask("crypto_bot.metrics")
+
+        @app.route(self.path)
+        def metrics():
+            return Response(self.registry.render(), mimetype="text/plain; version=0.0.4")
+
+        return app
+
+    def start(self):
+        logging.getLogger("werkzeug").setLevel(logging.WARNING)
+        self.server = make_server(self.host, self.port, self.create_app(), threaded=True)
+        self.port = self.server.server_port
+        threading.Thread(target=self.server.serve_forever, name="metrics server", daemon=True).start()
+        self.logger.info("Serving metrics on http://{}:{}{}".format(self.host, self.port, self.path))
+        return self
+
+    def stop(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server = None
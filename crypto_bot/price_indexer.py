@@ -1,70 +1,301 @@
+import asyncio
 import logging
+import math
+import sys
 import threading
 import time
 
-import emoji
-
+from crypto_bot import metrics
 from crypto_bot.error import CoinNotFoundException
+from crypto_bot.events import PriceBus
+from crypto_bot.history import HistoryStore
+from crypto_bot.quotes import UP, DOWN, Quote, SnapshotPublisher
+from crypto_bot.snapshot import Snapshot
+from crypto_bot.ticker_store import TickerStore
+
+TICK_SECONDS = metrics.histogram('crypto_bot_indexer_tick_seconds', 'Indexer update loop tick duration')
+UPDATE_SECONDS = metrics.histogram('crypto_bot_exchange_update_seconds',
+                                   'Duration of a price update batch per exchange', ('exchange',))
+UPDATE_FAILURES = metrics.counter('crypto_bot_exchange_update_failures_total',
+                                  'Failed price update batches per exchange', ('exchange',))
+UPDATE_SKIPPED = metrics.counter('crypto_bot_exchange_update_skipped_total',
+                                 'Price update batches skipped while busy, backing off or late', ('exchange',))
+STALENESS = metrics.gauge('crypto_bot_exchange_staleness_seconds',
+                          'Seconds since the last successful price update per exchange', ('exchange',))
+SNAPSHOT_VERSION = metrics.gauge('crypto_bot_price_snapshot_version', 'Version of the published price snapshot')
+TRACKED_COINS = metrics.gauge('crypto_bot_tracked_coins', 'Number of coins tracked by the indexer')
+
+# Rows for coins created outside of an exchange, e.g. the copies held by indexer clients
+DETACHED_STORE = TickerStore()
 
 
 class Coin:
+    __slots__ = ('coin_id', 'symbol', 'name', 'store', 'row', '_info')
 
-    def __init__(self, id, symbol, name=None, exchange=None):
+    def __init__(self, id, symbol, name=None, exchange=None, store=None):
         self.coin_id = id
-        self.symbol = symbol.lower()
+        self.symbol = sys.intern(symbol.lower())
         self.name = name
-        self.price = 0
-        self.perc = 0
-        self.direction = ""
-        self.last_exchange = exchange
-        self.info = {}
+        if store is None:
+            self.store = DETACHED_STORE
+            self.row = DETACHED_STORE.new_row(self.symbol, exchange)
+        else:
+            self.store = store
+            self.row = store.row(self.symbol, exchange)
+        self._info = None
+
+    @property
+    def info(self):
+        return self._info if self._info is not None else {}
+
+    @info.setter
+    def info(self, info):
+        self._info = info
+
+    @property
+    def price(self):
+        return float(self.store.price[self.row])
+
+    @property
+    def perc(self):
+        p = float(self.store.perc[self.row])
+        return "N/A" if math.isnan(p) else p
+
+    @property
+    def direction(self):
+        p = self.perc
+        if not self.timestamp or p == "N/A":
+            return ""
+        return UP if p >= 0 else DOWN
+
+    @property
+    def last_exchange(self):
+        return self.store.exchange_name(self.row)
+
+    @property
+    def timestamp(self):
+        return float(self.store.timestamp[self.row])
 
     def update(self, price, perc, exchange=None):
-        self.price = float(price)
-        try:
-            self.perc = round(float(perc), 2)
-            self.direction = emoji.emojize(
-                ":green_circle:" if self.perc >= 0 else ":red_circle:", use_aliases=True)
-        except ValueError:
-            self.perc = perc or "N/A"
-        if exchange:
-            self.last_exchange = exchange
+        self.store.update(self.row, price, perc, exchange)
+
+
+class _Run:
+
+    def __init__(self, symbols, deadline):
+        self.symbols = symbols
+        self.deadline = deadline
+        self.done = False
+        self.fetched = False
+
+    def merge(self, symbols, deadline):
+        self.symbols = set(self.symbols) | set(symbols)
+        self.deadline = max(self.deadline, deadline)
+
+
+class ExchangeWorker:
+
+    def __init__(self, indexer, exchange, max_backoff=300):
+        self.indexer = indexer
+        self.exchange = exchange
+        self.max_backoff = max_backoff
+        self.logger = logging.getLogger("{} worker".format(exchange.name))
+        self.cond = threading.Condition()
+        self.thread = None
+        self.running = False
+        self.pending = None
+        self.busy = False
+        self.failures = 0
+        self.backoff_until = 0
+        self.completed = 0
+        self.skipped = 0
+        self.missed_deadlines = 0
+        self.last_duration = 0
+        self.last_success = None
+
+    def start(self):
+        with self.cond:
+            if self.thread and self.thread.is_alive():
+                return
+            self.running = True
+            self.thread = threading.Thread(target=self.run, name="{} worker".format(self.exchange.name),
+                                           daemon=True)
+            self.thread.start()
+
+    def stop(self):
+        with self.cond:
+            self.running = False
+            self.cond.notify_all()
+
+    def submit(self, symbols, deadline):
+        self.start()
+        with self.cond:
+            if self.busy or self.pending is not None or time.monotonic() < self.backoff_until:
+                self.skipped += 1
+                UPDATE_SKIPPED.inc(exchange=self.exchange.name)
+                return False
+            self.pending = _Run(symbols, deadline)
+            self.cond.notify_all()
+            return True
+
+    def enqueue(self, symbols, deadline):
+        # Joins the queued run, if any, instead of being refused behind it
+        self.start()
+        with self.cond:
+            if self.pending is None:
+                self.pending = _Run(symbols, deadline)
+            else:
+                self.pending.merge(symbols, deadline)
+            self.cond.notify_all()
+            return self.pending
+
+    def join(self, run, deadline):
+        with self.cond:
+            while not run.done:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self.cond.wait(remaining)
+        return run.fetched
+
+    def run_now(self, symbols, timeout):
+        deadline = time.monotonic() + timeout
+        return self.join(self.enqueue(symbols, deadline), deadline)
+
+    def finish(self, run, fetched):
+        with self.cond:
+            self.busy = False
+            run.done = True
+            run.fetched = fetched
+            self.cond.notify_all()
+
+    def run(self):
+        while True:
+            with self.cond:
+                while self.running and self.pending is None:
+                    self.cond.wait()
+                if not self.running:
+                    return
+                run, self.pending = self.pending, None
+                if time.monotonic() > run.deadline:
+                    self.skipped += 1
+                    UPDATE_SKIPPED.inc(exchange=self.exchange.name)
+                    run.done = True
+                    self.cond.notify_all()
+                    continue
+                self.busy = True
+            start = time.monotonic()
+            fetched = False
+            try:
+                self.indexer.get_coins_from_exchange(self.exchange, run.symbols)
+                fetched = True
+                self.failures = 0
+                self.completed += 1
+                self.last_success = time.time()
+            except Exception as e:
+                self.failures += 1
+                UPDATE_FAILURES.inc(exchange=self.exchange.name)
+                delay = min(self.max_backoff, self.indexer.update_rate * 2 ** self.failures)
+                self.backoff_until = time.monotonic() + delay
+                self.logger.error("Update failed ({} in a row), backing off {}s: {}".format(
+                    self.failures, round(delay, 1), e))
+            finally:
+                end = time.monotonic()
+                self.last_duration = end - start
+                UPDATE_SECONDS.observe(self.last_duration, exchange=self.exchange.name)
+                if end > run.deadline:
+                    self.missed_deadlines += 1
+                self.finish(run, fetched)
+
+    def available(self):
+        return time.monotonic() >= self.backoff_until
+
+    def stats(self):
+        return {
+            'completed': self.completed,
+            'skipped': self.skipped,
+            'missed_deadlines': self.missed_deadlines,
+            'failures': self.failures,
+            'last_duration': round(self.last_duration, 3),
+            'last_success': self.last_success,
+        }
 
 
 class PriceIndexer:
 
-    def __init__(self, exchanges, update_rate):
+    def __init__(self, exchanges, update_rate, change_threshold=None, history_tiers=None, snapshot=None):
         self.info_exchange = None
         for e in exchanges:
             if e.name.lower() == 'coingecko':
                 self.info_exchange = e
         self.exchanges_by_priority = sorted(exchanges, key=lambda x: x.priority)
         self.update_rate = update_rate
+        self.workers = {e.name: ExchangeWorker(self, e) for e in self.exchanges_by_priority}
+        change_threshold = change_threshold or {}
+        self.bus = PriceBus(change_threshold.get('price', 0.01), change_threshold.get('perc', 0.01))
+        self.history = HistoryStore(history_tiers)
+        self.prices = SnapshotPublisher()
+        self.shared = None
+        self.snapshot = snapshot if isinstance(snapshot, Snapshot) else Snapshot.from_config(snapshot)
         self.coins = {}
+        self.routes = {}
+        self.route_versions = None
         self.logger = logging.getLogger("indexer")
         self.ready = False
+        self.running = False
+        self.stats_interval = 60
+        self.last_stats = 0
+        self.started = time.time()
+
+    def load_snapshot(self):
+        return self.snapshot.load(self)
+
+    def save_snapshot(self, force=False):
+        if not force and not self.snapshot.due():
+            return
+        try:
+            self.snapshot.save(self)
+        except Exception as e:
+            self.logger.error("Error saving snapshot: {}".format(e))
+
+    def start_exchanges(self, loop):
+        return [e.start(loop) for e in self.exchanges_by_priority]
 
-    def wait_exchanges(self):
+    def stop_exchanges(self):
+        return [t for t in (e.stop() for e in self.exchanges_by_priority) if t]
+
+    async def wait_exchanges(self):
         while set([e.ready for e in self.exchanges_by_priority]) != {True}:
             self.logger.info("Waiting for exchanges...")
-            time.sleep(0.5)
+            await asyncio.sleep(0.5)
+
+    def build_route(self, symbol):
+        return [e for e in self.exchanges_by_priority if symbol in e.coins]
+
+    def refresh_routes(self):
+        versions = tuple(e.list_version for e in self.exchanges_by_priority)
+        if versions == self.route_versions:
+            return
+        self.routes = {s: self.build_route(s) for s in list(self.coins)}
+        self.route_versions = versions
+        self.logger.debug("Rebuilt routes for {} coins".format(len(self.routes)))
+
+    def get_route(self, symbol):
+        return [e.name for e in self.routes.get(symbol.lower(), [])]
 
     def add_new_coin(self, symbol):
-        c = None
-        for e in self.exchanges_by_priority:
-            try:
-                c = e.get_coin_def(symbol)
-                break
-            except CoinNotFoundException:
-                pass
-        if not c:
+        symbol = symbol.lower()
+        route = self.build_route(symbol)
+        if not route:
             raise CoinNotFoundException(symbol)
+        c = route[0].get_coin_def(symbol)
         if self.info_exchange:
             try:
                 c.name = self.info_exchange.get_coin_def(symbol).name
             except Exception as e:
                 self.logger.error("Error setting coin {} name {}".format(c.symbol, e))
-        self.coins[symbol.lower()] = c
+        self.routes[symbol] = route
+        self.coins[symbol] = c
 
     def get_coin(self, symbol, wait=False, info=False):
         symbol = symbol.lower()
@@ -79,45 +310,139 @@ class PriceIndexer:
                 raise AssertionError("Coingecko API not present, info for {} not available".format(symbol))
         return self.coins[symbol]
 
+    def price_snapshot(self):
+        return self.prices.current
+
+    def get_quote(self, symbol):
+        q = self.prices.current.get(symbol)
+        if q is None:
+            coin = self.coins.get(symbol.lower())
+            if coin is not None and coin.timestamp:
+                return Quote.from_coin(coin)
+        return q
+
+    def share_prices(self, table):
+        quotes = {}
+        for s in list(self.coins):
+            q = self.get_quote(s)
+            if q is not None:
+                quotes[s] = q
+        table.publish(quotes)
+        self.shared = table
+
     def get_icon(self, symbol):
         self.get_coin(symbol, wait=True)
         return self.info_exchange.get_icon(symbol)
 
+    @property
+    def icon_cache(self):
+        return self.info_exchange.icon_cache if self.info_exchange else None
+
     def run(self):
-        threading.Thread(target=self.update_loop).start()
+        self.running = True
+        metrics.add_collector(self.collect_metrics)
+        for w in self.workers.values():
+            w.start()
+        threading.Thread(target=self.update_loop, daemon=True).start()
+
+    def stop(self):
+        self.running = False
+        metrics.remove_collector(self.collect_metrics)
+        for w in self.workers.values():
+            w.stop()
+        if self.snapshot.enabled:
+            self.save_snapshot(force=True)
 
     def update_loop(self):
-        while True:
-            self.update_coins()
-            self.check_new_coins()
-            time.sleep(self.update_rate)
+        next_tick = time.monotonic()
+        while self.running:
+            try:
+                with TICK_SECONDS.time():
+                    self.update_coins()
+                    self.log_pool_stats()
+                    self.save_snapshot()
+            except Exception as e:
+                self.logger.error(e)
+            next_tick += self.update_rate
+            now = time.monotonic()
+            if next_tick < now:
+                next_tick = now
+            time.sleep(next_tick - now)
 
-    def check_new_coins(self):
-        try:
-            c =  {e.name: e.get_new_coins() for e in self.exchanges_by_priority}
-            return {c: i for c, i in c.items() if i}
-        except Exception as e:
-            self.logger.error(e)
+    def collect_metrics(self):
+        now = time.time()
+        for name, w in self.workers.items():
+            STALENESS.set(now - (w.last_success or self.started), exchange=name)
+        SNAPSHOT_VERSION.set(self.prices.current.version)
+        TRACKED_COINS.set(len(self.coins))
 
-    def clear_new_coins(self):
+    def log_pool_stats(self):
+        if time.time() - self.last_stats < self.stats_interval:
+            return
+        self.last_stats = time.time()
         for e in self.exchanges_by_priority:
-            e.clear_new_coins()
+            try:
+                self.logger.debug("{} http pool: {}".format(e.name, e.pool_stats()))
+            except Exception as ex:
+                self.logger.error(ex)
+        for name, w in self.workers.items():
+            self.logger.debug("{} worker: {}".format(name, w.stats()))
+        self.logger.debug("Price bus: {}".format(self.bus.stats()))
+        if self.info_exchange:
+            self.logger.debug("{} info cache: {}".format(self.info_exchange.name, self.info_exchange.info_stats()))
 
-    def update_coins(self, wait=False):
+    def listing_cursors(self):
+        return {e.name: e.listings.generation for e in self.exchanges_by_priority}
 
-        remaining = set(self.coins.keys())
+    def new_coins_since(self, cursors):
+        new_coins = {}
         for e in self.exchanges_by_priority:
+            cursors[e.name], entries, missed = e.listings.since(cursors.get(e.name, 0))
+            if missed:
+                self.logger.warning("{} listings from {} were dropped before they were read, resyncing at {}"
+                                    .format(missed, e.name, cursors[e.name]))
+            if entries:
+                new_coins[e.name] = [symbol for _, symbol, _ in entries]
+        return new_coins
+
+    def route_coins(self):
+        self.refresh_routes()
+        by_exchange = {}
+        for symbol, route in list(self.routes.items()):
+            if not route:
+                continue
+            available = [e for e in route if self.workers[e.name].available()]
+            by_exchange.setdefault((available or route)[0], set()).add(symbol)
+        return by_exchange
+
+    def update_coins(self, wait=False):
+        deadline = time.monotonic() + (max(self.update_rate, 10) if wait else self.update_rate)
+        runs = []
+        for e, update_list in self.route_coins().items():
             try:
-                e.update_list = remaining.intersection(set(e.coins.keys()))
-                remaining -= e.update_list
+                worker = self.workers[e.name]
                 if wait:
-                    self.get_coins_from_exchange(e)
+                    runs.append((worker, worker.enqueue(update_list, deadline)))
                 else:
-                    threading.Thread(target=self.get_coins_from_exchange, args=(e,)).start()
-            except Exception as e:
-                self.logger.error(e)
+                    worker.submit(update_list, deadline)
+            except Exception as ex:
+                self.logger.error(ex)
+        # every worker runs on its own thread, so one shared deadline bounds the whole wait
+        for worker, run in runs:
+            if not worker.join(run, deadline):
+                self.logger.warning("{} update was dropped, failed or did not finish in time".format(
+                    worker.exchange.name))
 
-    def get_coins_from_exchange(self, exchange):
-        updates = exchange.get_tickers(exchange.update_list)
+    def get_coins_from_exchange(self, exchange, symbols):
+        updates = exchange.get_tickers(symbols)
+        now = time.time()
+        quotes = {}
         for c, v in updates.items():
             self.coins[c].update(v[0], v[1], exchange.name)
+            quotes[c] = Quote.create(v[0], v[1], exchange.name, now)
+        self.prices.publish(quotes)
+        if self.shared is not None:
+            self.shared.publish(quotes)
+        for c, q in quotes.items():
+            self.history.record(c, q.price, q.timestamp)
+            self.bus.publish(c, q.price, q.perc, q.exchange)
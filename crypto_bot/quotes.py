@@ -0,0 +1,64 @@
+import threading
+import time
+from collections import namedtuple
+from types import MappingProxyType
+
+import emoji
+
+UP = emoji.emojize(":green_circle:", use_aliases=True)
+DOWN = emoji.emojize(":red_circle:", use_aliases=True)
+
+
+class Quote(namedtuple('Quote', ('price', 'perc', 'exchange', 'timestamp'))):
+    __slots__ = ()
+
+    @classmethod
+    def create(cls, price, perc, exchange=None, timestamp=None):
+        try:
+            perc = round(float(perc), 2)
+        except (TypeError, ValueError):
+            perc = "N/A"
+        return cls(float(price), perc, exchange, timestamp or time.time())
+
+    @classmethod
+    def from_coin(cls, coin):
+        return cls(coin.price, coin.perc, coin.last_exchange, coin.timestamp)
+
+    @property
+    def direction(self):
+        if not self.timestamp or self.perc == "N/A":
+            return ""
+        return UP if self.perc >= 0 else DOWN
+
+
+class PriceSnapshot:
+    __slots__ = ('version', 'quotes')
+
+    def __init__(self, version=0, quotes=None):
+        self.version = version
+        self.quotes = MappingProxyType(quotes if quotes is not None else {})
+
+    def get(self, symbol):
+        return self.quotes.get(symbol.lower())
+
+    def __contains__(self, symbol):
+        return symbol.lower() in self.quotes
+
+    def __len__(self):
+        return len(self.quotes)
+
+
+class SnapshotPublisher:
+
+    def __init__(self):
+        self.current = PriceSnapshot()
+        self.lock = threading.Lock()
+
+    def publish(self, quotes):
+        if not quotes:
+            return self.current
+        with self.lock:
+            merged = dict(self.current.quotes)
+            merged.update(quotes)
+            self.current = PriceSnapshot(self.current.version + 1, merged)
+            return self.current
@@ -0,0 +1,156 @@
+import asyncio
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+from crypto_bot.error import RateLimitedException
+from crypto_bot.http_client import HttpStatusError
+
+
+def in_event_loop():
+    try:
+        asyncio.get_running_loop()
+        return True
+    except RuntimeError:
+        return False
+
+
+class TokenBucket:
+
+    def __init__(self, rate, burst):
+        self.rate = float(rate)
+        self.capacity = float(burst)
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.paused_until = 0
+
+    def refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, now=None):
+        now = now or time.monotonic()
+        if now < self.paused_until:
+            return self.paused_until - now
+        self.refill(now)
+        if self.tokens >= 1:
+            return 0
+        return (1 - self.tokens) / self.rate
+
+    def take(self, now=None):
+        now = now or time.monotonic()
+        wait = self.wait_time(now)
+        if wait <= 0:
+            self.tokens -= 1
+        return wait
+
+    def pause(self, seconds):
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+        self.tokens = 0
+
+
+class RequestScheduler:
+
+    def __init__(self, name, rate, burst, lanes, max_retries=3, base_backoff=2, max_backoff=120):
+        self.name = name
+        self.bucket = TokenBucket(rate, burst)
+        self.lanes = {l: i for i, l in enumerate(lanes)}
+        self.waiting = [0] * len(lanes)
+        self.max_retries = max_retries
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.throttled = 0
+        self.cond = threading.Condition()
+        self.logger = logging.getLogger("{} scheduler".format(name))
+
+    def _try_acquire(self, priority):
+        if any(self.waiting[:priority]):
+            return max(self.bucket.wait_time(), 0.01)
+        return self.bucket.take()
+
+    def _enter(self, lane):
+        priority = self.lanes[lane]
+        with self.cond:
+            self.waiting[priority] += 1
+        return priority
+
+    def _leave(self, priority):
+        with self.cond:
+            self.waiting[priority] -= 1
+            self.cond.notify_all()
+
+    def acquire(self, lane):
+        # Waiting here on an event loop thread would stall every bot on it, fail fast instead
+        blocking = not in_event_loop()
+        priority = self._enter(lane)
+        try:
+            with self.cond:
+                while True:
+                    wait = self._try_acquire(priority)
+                    if wait <= 0:
+                        return
+                    if not blocking:
+                        raise RateLimitedException(self.name, wait)
+                    self.cond.wait(wait)
+        finally:
+            self._leave(priority)
+
+    async def acquire_async(self, lane):
+        priority = self._enter(lane)
+        try:
+            while True:
+                with self.cond:
+                    wait = self._try_acquire(priority)
+                if wait <= 0:
+                    return
+                await asyncio.sleep(wait)
+        finally:
+            self._leave(priority)
+
+    def retry_after(self, error, attempt):
+        header = error.headers.get('Retry-After')
+        if header:
+            try:
+                return float(header)
+            except ValueError:
+                pass
+            try:
+                return max(0, (parsedate_to_datetime(header) - datetime.now(timezone.utc)).total_seconds())
+            except (TypeError, ValueError):
+                pass
+        return min(self.max_backoff, self.base_backoff * 2 ** attempt)
+
+    def backoff(self, error, attempt):
+        if not isinstance(error, HttpStatusError) or error.status != 429 or attempt >= self.max_retries:
+            return None
+        delay = self.retry_after(error, attempt)
+        self.logger.warning("Rate limited by {}, backing off {}s".format(self.name, round(delay, 2)))
+        with self.cond:
+            self.throttled += 1
+            self.bucket.pause(delay)
+            self.cond.notify_all()
+        return delay
+
+    def call(self, lane, fn, *args, **kwargs):
+        attempt = 0
+        while True:
+            self.acquire(lane)
+            try:
+                return fn(*args, **kwargs)
+            except Exception as e:
+                if self.backoff(e, attempt) is None:
+                    raise
+            attempt += 1
+
+    async def call_async(self, lane, fn, *args, **kwargs):
+        attempt = 0
+        while True:
+            await self.acquire_async(lane)
+            try:
+                return await fn(*args, **kwargs)
+            except Exception as e:
+                if self.backoff(e, attempt) is None:
+                    raise
+            attempt += 1
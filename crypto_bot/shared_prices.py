@@ -0,0 +1,215 @@
+import logging
+import math
+import threading
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from crypto_bot.quotes import Quote
+
+CAPACITY, SYMBOL_SIZE, COUNT, VERSION, EXCHANGES = range(5)
+HEADER_FIELDS = 8
+MAX_EXCHANGES = 32
+EXCHANGE_SIZE = 32
+ROW = np.dtype([
+    ('seq', np.uint64),
+    ('price', np.float64),
+    ('perc', np.float64),
+    ('timestamp', np.float64),
+    ('exchange', np.int64),
+])
+
+
+def table_size(capacity, symbol_size):
+    return HEADER_FIELDS * 8 + MAX_EXCHANGES * EXCHANGE_SIZE + capacity * symbol_size + capacity * ROW.itemsize
+
+
+# One writer process publishes, any number of processes read. Every row carries a sequence
+# counter that is odd while the writer is updating it, readers retry until they see the
+# same even value before and after copying the row.
+class SharedPriceTable:
+
+    def __init__(self, shm, owner=False):
+        self.shm = shm
+        self.owner = owner
+        buf = shm.buf
+        self.header = np.ndarray(HEADER_FIELDS, dtype=np.int64, buffer=buf)
+        self.capacity = int(self.header[CAPACITY])
+        self.symbol_size = int(self.header[SYMBOL_SIZE])
+        offset = HEADER_FIELDS * 8
+        self.exchange_table = np.ndarray(MAX_EXCHANGES, dtype="S{}".format(EXCHANGE_SIZE), buffer=buf,
+                                         offset=offset)
+        offset += MAX_EXCHANGES * EXCHANGE_SIZE
+        self.symbol_table = np.ndarray(self.capacity, dtype="S{}".format(self.symbol_size), buffer=buf,
+                                       offset=offset)
+        offset += self.capacity * self.symbol_size
+        self.rows = np.ndarray(self.capacity, dtype=ROW, buffer=buf, offset=offset)
+        self.seq = self.rows['seq']
+        self.price = self.rows['price']
+        self.perc = self.rows['perc']
+        self.timestamp = self.rows['timestamp']
+        self.exchange = self.rows['exchange']
+        self.index = {}
+        self.symbols = []
+        self.exchange_names = []
+        self.exchange_ids = {}
+        self.lock = threading.Lock()
+        self.full = False
+        self.logger = logging.getLogger("price table")
+        self.refresh()
+
+    @classmethod
+    def create(cls, name, capacity=20000, symbol_size=16):
+        shm = shared_memory.SharedMemory(name=name, create=True, size=table_size(capacity, symbol_size))
+        header = np.ndarray(HEADER_FIELDS, dtype=np.int64, buffer=shm.buf)
+        header[:] = 0
+        header[CAPACITY] = capacity
+        header[SYMBOL_SIZE] = symbol_size
+        del header
+        return cls(shm, owner=True)
+
+    @classmethod
+    def attach(cls, name, writer=False):
+        table = cls(shared_memory.SharedMemory(name=name))
+        if writer:
+            # a previous writer may have died halfway through a row
+            n = len(table)
+            table.seq[:n][table.seq[:n] & 1 == 1] += 1
+        return table
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    @property
+    def version(self):
+        return int(self.header[VERSION])
+
+    def __len__(self):
+        return int(self.header[COUNT])
+
+    def refresh(self):
+        with self.lock:
+            count = int(self.header[COUNT])
+            for i in range(len(self.symbols), count):
+                s = self.symbol_table[i].decode()
+                self.symbols.append(s)
+                self.index[s] = i
+            count = int(self.header[EXCHANGES])
+            for i in range(len(self.exchange_names), count):
+                e = self.exchange_table[i].decode()
+                self.exchange_names.append(e)
+                self.exchange_ids[e] = i
+
+    def exchange_id(self, name):
+        if name is None:
+            return -1
+        i = self.exchange_ids.get(name)
+        if i is None:
+            i = len(self.exchange_names)
+            encoded = name.encode()
+            if i >= MAX_EXCHANGES or len(encoded) > EXCHANGE_SIZE:
+                return -1
+            self.exchange_table[i] = encoded
+            self.header[EXCHANGES] = i + 1
+            self.exchange_names.append(name)
+            self.exchange_ids[name] = i
+        return i
+
+    def fits(self, symbol):
+        if symbol in self.index:
+            return True
+        self.refresh()
+        return symbol in self.index or (len(symbol.encode()) <= self.symbol_size and len(self) < self.capacity)
+
+    def row(self, symbol):
+        r = self.index.get(symbol)
+        if r is None:
+            r = len(self.symbols)
+            encoded = symbol.encode()
+            if r >= self.capacity or len(encoded) > self.symbol_size:
+                if not self.full:
+                    self.full = True
+                    self.logger.warning("Cannot share price of {}, table holds {} symbols of up to {} bytes, "
+                                        "readers fall back to the indexer service".format(
+                                            symbol, self.capacity, self.symbol_size))
+                return None
+            self.symbol_table[r] = encoded
+            self.header[COUNT] = r + 1
+            self.symbols.append(symbol)
+            self.index[symbol] = r
+        return r
+
+    def publish(self, quotes):
+        if not quotes:
+            return
+        with self.lock:
+            for s, q in quotes.items():
+                r = self.row(s)
+                if r is None:
+                    continue
+                self.seq[r] += 1
+                self.price[r] = q.price
+                self.perc[r] = q.perc if q.perc != "N/A" else math.nan
+                self.timestamp[r] = q.timestamp or 0
+                self.exchange[r] = self.exchange_id(q.exchange)
+                self.seq[r] += 1
+            self.header[VERSION] += 1
+
+    def quote(self, price, perc, exchange, timestamp):
+        if exchange >= len(self.exchange_names):
+            self.refresh()
+        return Quote(price, "N/A" if math.isnan(perc) else perc,
+                     self.exchange_names[exchange] if 0 <= exchange < len(self.exchange_names) else None,
+                     timestamp or None)
+
+    def read_row(self, r):
+        while True:
+            seq = self.seq[r]
+            if seq & 1:
+                time.sleep(0)
+                continue
+            values = (float(self.price[r]), float(self.perc[r]), int(self.exchange[r]), float(self.timestamp[r]))
+            if self.seq[r] == seq:
+                return values
+
+    def get(self, symbol):
+        r = self.index.get(symbol)
+        if r is None:
+            self.refresh()
+            r = self.index.get(symbol)
+            if r is None:
+                return None
+        if not self.seq[r]:
+            return None
+        return self.quote(*self.read_row(r))
+
+    def read_all(self):
+        self.refresh()
+        n = len(self.symbols)
+        data = self.rows[:n].copy()
+        torn = set(np.flatnonzero((data['seq'] & 1).astype(bool) | (self.seq[:n] != data['seq'])).tolist())
+        quotes = {}
+        for r, (seq, price, perc, timestamp, exchange) in enumerate(data.tolist()):
+            if r in torn:
+                price, perc, exchange, timestamp = self.read_row(r)
+            elif not seq:
+                continue
+            quotes[self.symbols[r]] = self.quote(price, perc, exchange, timestamp)
+        return quotes
+
+    def close(self):
+        self.header = self.exchange_table = self.symbol_table = self.rows = None
+        self.seq = self.price = self.perc = self.timestamp = self.exchange = None
+        try:
+            self.shm.close()
+        except BufferError:
+            pass
+
+    def unlink(self):
+        self.close()
+        try:
+            self.shm.unlink()
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,99 @@
+import json
+import logging
+import os
+import time
+
+import numpy as np
+
+from crypto_bot.error import CoinNotFoundException
+
+VERSION = 1
+
+
+class Snapshot:
+
+    def __init__(self, path="cache/snapshot.npz", interval=300, max_age=86400, enabled=False):
+        self.path = path
+        self.interval = interval
+        self.max_age = max_age
+        self.enabled = enabled
+        self.last_save = time.time()
+        self.logger = logging.getLogger("snapshot")
+
+    @classmethod
+    def from_config(cls, config, base_dir=None):
+        if not config:
+            return cls(enabled=False)
+        path = config.get('path', "cache/snapshot.npz")
+        if base_dir and not os.path.isabs(path):
+            path = os.path.join(base_dir, path)
+        return cls(path, config.get('interval', 300), config.get('max_age', 86400), config.get('enabled', True))
+
+    def due(self):
+        return self.enabled and time.time() - self.last_save >= self.interval
+
+    def save(self, indexer):
+        self.last_save = time.time()
+        arrays = {}
+        meta = {'version': VERSION, 'created': self.last_save, 'tracked': list(indexer.coins), 'exchanges': []}
+        for e in indexer.exchanges_by_priority:
+            if not e.ready:
+                continue
+            fields = {}
+            for k, v in e.dump_state().items():
+                if isinstance(v, np.ndarray):
+                    arrays["{}:{}".format(e.name, k)] = v
+                else:
+                    fields[k] = v
+            meta['exchanges'].append({'name': e.name, 'fields': fields})
+        if not meta['exchanges']:
+            return False
+        arrays['meta'] = np.array(json.dumps(meta))
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, 'wb') as f:
+            np.savez_compressed(f, **arrays)
+        os.replace(tmp, self.path)
+        self.logger.debug("Saved snapshot of {} exchanges to {} ({} bytes)".format(
+            len(meta['exchanges']), self.path, os.path.getsize(self.path)))
+        return True
+
+    def load(self, indexer):
+        if not self.enabled or not os.path.exists(self.path):
+            return False
+        try:
+            with np.load(self.path, allow_pickle=False) as data:
+                meta = json.loads(str(data['meta']))
+                if meta.get('version') != VERSION:
+                    self.logger.warning("Ignoring snapshot {} with version {}".format(self.path, meta.get('version')))
+                    return False
+                age = time.time() - meta['created']
+                if age > self.max_age:
+                    self.logger.info("Ignoring snapshot {} - {}s old".format(self.path, int(age)))
+                    return False
+                exchanges = {e.name: e for e in indexer.exchanges_by_priority}
+                for entry in meta['exchanges']:
+                    e = exchanges.get(entry['name'])
+                    if e is None:
+                        continue
+                    state = dict(entry['fields'])
+                    if state.get('overrides') != e.overrides_digest():
+                        self.logger.info("Coin overrides for {} changed, not restoring it".format(e.name))
+                        continue
+                    prefix = e.name + ":"
+                    for k in data.files:
+                        if k.startswith(prefix):
+                            state[k[len(prefix):]] = data[k]
+                    e.load_state(state)
+                    self.logger.info("Restored {} coins for {} from snapshot".format(len(e.coins), e.name))
+        except Exception as e:
+            self.logger.error("Failed loading snapshot {}: {}".format(self.path, e))
+            return False
+
+        for symbol in meta.get('tracked', []):
+            try:
+                indexer.add_new_coin(symbol)
+            except CoinNotFoundException:
+                continue
+        self.logger.info("Warm start from snapshot {} ({}s old)".format(self.path, int(age)))
+        return True
@@ -0,0 +1,43 @@
+import asyncio
+import contextlib
+import logging
+import time
+
+
+class Startup:
+
+    def __init__(self, concurrency=5):
+        self.concurrency = concurrency
+        self.timings = {}
+        self.started = time.monotonic()
+        self.logger = logging.getLogger("startup")
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        self.logger.info("Phase '{}' started".format(name))
+        start = time.monotonic()
+        try:
+            yield
+        except Exception as e:
+            self.logger.error("Phase '{}' failed: {}".format(name, e))
+            raise
+        finally:
+            self.timings[name] = time.monotonic() - start
+        self.logger.info("Phase '{}' finished in {:.2f}s".format(name, self.timings[name]))
+
+    async def bounded(self, calls, limit=None):
+        sem = asyncio.Semaphore(limit or self.concurrency)
+
+        async def run(call):
+            async with sem:
+                return await call()
+
+        return await asyncio.gather(*(run(c) for c in calls), return_exceptions=True)
+
+    async def in_threads(self, fn, args, limit=None):
+        loop = asyncio.get_running_loop()
+        return await self.bounded([lambda a=a: loop.run_in_executor(None, fn, a) for a in args], limit)
+
+    def summary(self):
+        phases = ", ".join("{} {:.2f}s".format(n, t) for n, t in self.timings.items())
+        return "Startup finished in {:.2f}s ({})".format(time.monotonic() - self.started, phases)
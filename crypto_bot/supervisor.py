@@ -0,0 +1,230 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import queue
+import signal
+import socket
+import time
+
+from crypto_bot.app import App
+from crypto_bot.bots import bot_globals
+from crypto_bot.indexer_service import IndexerClient, serve_indexer
+from crypto_bot.shared_prices import SharedPriceTable
+
+
+def free_port(host):
+    with socket.socket() as s:
+        s.bind((host, 0))
+        return s.getsockname()[1]
+
+
+def assign_shards(config, shards):
+    discord = config['discord']
+    tokens = []
+    for server in (discord.get('price_bots') or {}).values():
+        tokens.extend(server['instances'])
+    tokens.extend(discord.get('info_bots') or {})
+    tokens.extend(discord.get('message_bots') or {})
+    return {t: i % shards for i, t in enumerate(tokens)}
+
+
+def stop_on_sigterm(app):
+    try:
+        app.loop.add_signal_handler(signal.SIGTERM, app.loop.stop)
+    except NotImplementedError:
+        pass
+
+
+def run_indexer(cfg, address, authkey, table, health, interval):
+    app = App(cfg)
+    app.load_config()
+    app.start_metrics()
+    app.start_exchanges()
+    app.indexer.share_prices(SharedPriceTable.attach(table, writer=True))
+    serve_indexer(app.indexer, address, authkey)
+    app.indexer.run()
+    app.loop.create_task(heartbeat('indexer', health, interval, lambda: indexer_health(app)))
+    app.logger.info(app.startup.summary())
+    stop_on_sigterm(app)
+    app.run_forever()
+
+
+def indexer_health(app):
+    updated = [w.last_success for w in app.indexer.workers.values() if w.last_success]
+    return {
+        'coins': len(app.indexer.coins),
+        'stale': round(time.time() - max(updated), 1) if updated else None,
+    }
+
+
+def worker_health(app):
+    bots = app.bot_list
+    latencies = [b.latency for b in bots if b.is_ready() and b.latency == b.latency]
+    return {
+        'bots': len(bots),
+        'ready': sum(1 for b in bots if b.is_ready()),
+        'latency': round(sum(latencies) / len(latencies), 3) if latencies else None,
+    }
+
+
+async def heartbeat(shard, health, interval, stats):
+    while True:
+        try:
+            health.put_nowait(dict(stats(), shard=shard, pid=os.getpid(), time=time.time()))
+        except queue.Full:
+            pass
+        await asyncio.sleep(interval)
+
+
+def run_worker(cfg, shard, shards, address, authkey, table, health, interval):
+    app = App(cfg)
+    config = app.load_config()
+    app.logger = logging.getLogger("worker {}".format(shard))
+    app.start_metrics(offset=shard + 1)
+    shard_of = assign_shards(config, shards)
+    keep = lambda token: shard_of.get(token) == shard
+
+    if app.price_bots or app.info_bots:
+        app.indexer = bot_globals.indexer = IndexerClient(address, authkey, SharedPriceTable.attach(table),
+                                                          config['process'].get('change_threshold'))
+        if not app.indexer.wait_ready():
+            raise RuntimeError("Indexer service at {} did not become ready".format(address))
+        app.indexer.run()
+
+    app.create_bots(keep)
+    app.loop.create_task(heartbeat(shard, health, interval, lambda: worker_health(app)))
+    if app.bot_list:
+        app.login_bots()
+    app.logger.info(app.startup.summary())
+    stop_on_sigterm(app)
+    app.run_forever()
+
+
+class Supervisor:
+
+    def __init__(self, cfg, config, workers, check_interval=5, heartbeat_timeout=60, startup_timeout=600,
+                 max_backoff=60, stable_after=600):
+        self.cfg = cfg
+        self.config = config
+        self.workers = workers
+        sup = config['process'].get('supervisor') or {}
+        self.check_interval = sup.get('check_interval', check_interval)
+        self.heartbeat_timeout = sup.get('heartbeat_timeout', heartbeat_timeout)
+        self.startup_timeout = sup.get('startup_timeout', startup_timeout)
+        self.max_backoff = sup.get('max_backoff', max_backoff)
+        self.stable_after = sup.get('stable_after', stable_after)
+        self.report_interval = sup.get('report_interval', 60)
+        self.ctx = multiprocessing.get_context("spawn")
+        self.health = self.ctx.Queue(maxsize=1000)
+        self.authkey = os.urandom(16)
+        host = sup.get('host', "127.0.0.1")
+        self.address = (host, sup.get('port') or free_port(host))
+        self.needs_indexer = bool(config['discord'].get('price_bots') or config['discord'].get('info_bots'))
+        table = sup.get('price_table') or {}
+        self.table = SharedPriceTable.create("crypto_bot_{}".format(os.getpid()), table.get('capacity', 20000),
+                                             table.get('symbol_size', 16))
+        self.processes = {}
+        self.status = {}
+        self.restarts = {}
+        self.restart_at = {}
+        self.started = {}
+        self.last_report = time.time()
+        self.running = False
+        self.logger = logging.getLogger("supervisor")
+
+    def spawn(self, name):
+        if name == 'indexer':
+            p = self.ctx.Process(target=run_indexer, name=name,
+                                 args=(self.cfg, self.address, self.authkey, self.table.name, self.health,
+                                       self.check_interval))
+        else:
+            p = self.ctx.Process(target=run_worker, name="worker {}".format(name),
+                                 args=(self.cfg, name, self.workers, self.address, self.authkey, self.table.name,
+                                       self.health, self.check_interval))
+        p.start()
+        self.processes[name] = p
+        self.started[name] = time.time()
+        self.status.pop(name, None)
+        self.logger.info("Started {} (pid {})".format(p.name, p.pid))
+
+    def names(self):
+        return (['indexer'] if self.needs_indexer else []) + list(range(self.workers))
+
+    def drain_health(self):
+        while True:
+            try:
+                h = self.health.get_nowait()
+            except queue.Empty:
+                return
+            p = self.processes.get(h['shard'])
+            if p is not None and p.pid == h['pid']:
+                self.status[h['shard']] = h
+
+    def check(self):
+        now = time.time()
+        for name in self.names():
+            p = self.processes.get(name)
+            if p is not None and p.is_alive():
+                if self.restarts.get(name) and now - self.started[name] >= self.stable_after:
+                    self.logger.info("{} stable for {}s, resetting restart backoff".format(
+                        p.name, int(self.stable_after)))
+                    self.restarts[name] = 0
+                if name in self.status:
+                    last, timeout = self.status[name]['time'], self.heartbeat_timeout
+                else:
+                    last, timeout = self.started[name], self.startup_timeout
+                if now - last < timeout:
+                    continue
+                self.logger.error("{} missed heartbeats for {}s, terminating".format(p.name, int(now - last)))
+                p.terminate()
+                p.join(5)
+            elif p is not None and name not in self.restart_at:
+                self.restarts[name] = self.restarts.get(name, 0) + 1
+                delay = min(self.max_backoff, 2 ** (self.restarts[name] - 1))
+                self.restart_at[name] = now + delay
+                self.logger.error("{} exited with code {}, restarting in {}s".format(p.name, p.exitcode, delay))
+            if name in self.restart_at and now >= self.restart_at[name]:
+                del self.restart_at[name]
+                self.spawn(name)
+
+    def report(self):
+        if time.time() - self.last_report < self.report_interval:
+            return
+        self.last_report = time.time()
+        for name in self.names():
+            p = self.processes.get(name)
+            h = self.status.get(name) or {}
+            if name == 'indexer':
+                detail = "coins {} stale {}s".format(h.get('coins'), h.get('stale'))
+            else:
+                detail = "bots {} ready {} latency {}".format(h.get('bots'), h.get('ready'), h.get('latency'))
+            self.logger.info("{}: pid {} alive {} restarts {} {}".format(
+                p.name if p else name, p.pid if p else None, p.is_alive() if p else False,
+                self.restarts.get(name, 0), detail))
+
+    def stop(self):
+        self.running = False
+        for p in self.processes.values():
+            if p.is_alive():
+                p.terminate()
+        for p in self.processes.values():
+            p.join(10)
+        self.table.unlink()
+
+    def run(self):
+        self.running = True
+        self.logger.info("Supervising {} workers with indexer service on {}:{}".format(
+            self.workers, *self.address))
+        for name in self.names():
+            self.spawn(name)
+        try:
+            while self.running:
+                time.sleep(self.check_interval)
+                self.drain_health()
+                self.check()
+                self.report()
+        except KeyboardInterrupt:
+            self.logger.info("Shutting down workers...")
+        finally:
+            self.stop()
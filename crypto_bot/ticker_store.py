@@ -0,0 +1,119 @@
+import sys
+import threading
+import time
+
+import numpy as np
+
+
+def to_floats(values):
+    try:
+        return np.asarray(values, dtype=np.float64)
+    except (TypeError, ValueError):
+        out = np.full(len(values), np.nan)
+        for i, v in enumerate(values):
+            try:
+                out[i] = float(v)
+            except (TypeError, ValueError):
+                pass
+        return out
+
+
+class TickerStore:
+
+    def __init__(self, capacity=256):
+        self.index = {}
+        self.symbols = []
+        self.exchange_names = []
+        self.exchange_ids = {}
+        self.size = 0
+        self.lock = threading.Lock()
+        self.price = np.zeros(capacity, dtype=np.float64)
+        self.perc = np.zeros(capacity, dtype=np.float64)
+        self.timestamp = np.zeros(capacity, dtype=np.float64)
+        self.exchange = np.full(capacity, -1, dtype=np.int16)
+
+    def grow(self, capacity):
+        for col in ('price', 'perc', 'timestamp', 'exchange'):
+            old = getattr(self, col)
+            new = np.full(capacity, -1 if col == 'exchange' else 0, dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, col, new)
+
+    def exchange_id(self, name):
+        if name is None:
+            return -1
+        i = self.exchange_ids.get(name)
+        if i is None:
+            with self.lock:
+                i = self.exchange_ids.setdefault(name, len(self.exchange_names))
+                if i == len(self.exchange_names):
+                    self.exchange_names.append(sys.intern(name))
+        return i
+
+    def exchange_name(self, row):
+        i = self.exchange[row]
+        return self.exchange_names[i] if i >= 0 else None
+
+    def row(self, symbol, exchange=None):
+        r = self.index.get(symbol)
+        if r is not None:
+            return r
+        exchange_id = self.exchange_id(exchange)
+        with self.lock:
+            r = self.index.get(symbol)
+            if r is not None:
+                return r
+            r = self.allocate(symbol, exchange_id)
+            self.index[symbol] = r
+            return r
+
+    def new_row(self, symbol, exchange=None):
+        exchange_id = self.exchange_id(exchange)
+        with self.lock:
+            return self.allocate(symbol, exchange_id)
+
+    def allocate(self, symbol, exchange_id):
+        r = self.size
+        if r >= len(self.price):
+            self.grow(len(self.price) * 2)
+        self.exchange[r] = exchange_id
+        self.symbols.append(symbol)
+        self.size += 1
+        return r
+
+    def update(self, row, price, perc, exchange=None, timestamp=None):
+        price = float(price)
+        try:
+            perc = round(float(perc), 2)
+        except (TypeError, ValueError):
+            perc = np.nan
+        exchange_id = self.exchange_id(exchange) if exchange else None
+        with self.lock:
+            self.price[row] = price
+            self.perc[row] = perc
+            self.timestamp[row] = timestamp or time.time()
+            if exchange_id is not None:
+                self.exchange[row] = exchange_id
+
+    def apply_snapshot(self, symbols, prices, percs, exchange=None, timestamp=None):
+        rows = np.fromiter((self.row(s) for s in symbols), dtype=np.int64, count=len(symbols))
+        prices = to_floats(prices)
+        valid = ~np.isnan(prices)
+        rows = rows[valid]
+        percs = np.round(to_floats(percs)[valid], 2)
+        exchange_id = self.exchange_id(exchange) if exchange else None
+        with self.lock:
+            self.price[rows] = prices[valid]
+            self.perc[rows] = percs
+            self.timestamp[rows] = timestamp or time.time()
+            if exchange_id is not None:
+                self.exchange[rows] = exchange_id
+        return rows
+
+    def load(self, symbols, prices, percs, timestamps):
+        rows = np.fromiter((self.row(s) for s in symbols), dtype=np.int64, count=len(symbols))
+        with self.lock:
+            self.price[rows] = prices
+            self.perc[rows] = percs
+            self.timestamp[rows] = timestamps
+        return rows
@@ -39,11 +39,13 @@ setup(name='crypto-bot',
           'Flask',
           'Werkzeug',
           'requests',
+          'aiohttp>=3.7',
           'ruamel.yaml',
           'python-dateutil',
           'pytz',
           'python-twitter',
-          'emoji'
+          'emoji',
+          'numpy'
       ],
       extras_require={
           'setup': setup_deps,
@@ -0,0 +1,153 @@
+import argparse
+import asyncio
+import json
+import logging
+
+from aiohttp import web, WSMsgType
+
+
+class ReplayServer:
+
+    def __init__(self, recording, host="127.0.0.1", port=0, speed=1.0, repeat=False, disconnect_after=None):
+        self.host = host
+        self.port = port
+        self.speed = speed
+        self.repeat = repeat
+        self.disconnect_after = disconnect_after
+        self.logger = logging.getLogger("replay")
+        self.snapshots = {}
+        self.frames = {}
+        self.runner = None
+
+        for r in recording:
+            if r['type'] == 'snapshot':
+                self.snapshots[r['exchange']] = r['data']
+            else:
+                self.frames.setdefault(r['exchange'], []).append((r.get('delay', 0), r['data']))
+
+    @classmethod
+    def from_file(cls, path, **kwargs):
+        with open(path) as f:
+            return cls([json.loads(l) for l in f if l.strip()], **kwargs)
+
+    @property
+    def url(self):
+        return "http://{}:{}".format(self.host, self.port)
+
+    @property
+    def ws_url(self):
+        return "ws://{}:{}".format(self.host, self.port)
+
+    def app(self):
+        app = web.Application()
+        app.router.add_get('/api/v1/market/allTickers', self.snapshot_handler('kucoin'))
+        app.router.add_post('/api/v1/bullet-public', self.kucoin_token)
+        app.router.add_get('/kucoin', self.kucoin_stream)
+        app.router.add_get('/api/v3/ticker/24hr', self.snapshot_handler('binance_us'))
+        app.router.add_get('/ws/!ticker@arr', self.binance_stream)
+        return app
+
+    def snapshot_handler(self, exchange):
+        async def handler(request):
+            if exchange not in self.snapshots:
+                raise web.HTTPNotFound()
+            return web.json_response(self.snapshots[exchange])
+        return handler
+
+    async def kucoin_token(self, request):
+        return web.json_response({
+            'code': '200000',
+            'data': {
+                'token': 'replay',
+                'instanceServers': [{
+                    'endpoint': self.ws_url + '/kucoin',
+                    'protocol': 'websocket',
+                    'encrypt': False,
+                    'pingInterval': 18000,
+                    'pingTimeout': 10000
+                }]
+            }
+        })
+
+    async def kucoin_stream(self, request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        await ws.send_json({'id': request.query.get('connectId'), 'type': 'welcome'})
+
+        async def read():
+            async for msg in ws:
+                if msg.type != WSMsgType.TEXT:
+                    continue
+                m = json.loads(msg.data)
+                if m.get('type') == 'ping':
+                    await ws.send_json({'id': m.get('id'), 'type': 'pong'})
+                elif m.get('type') == 'subscribe':
+                    await ws.send_json({'id': m.get('id'), 'type': 'ack'})
+
+        reader = asyncio.ensure_future(read())
+        try:
+            await self.replay(ws, 'kucoin')
+        finally:
+            reader.cancel()
+            await ws.close()
+        return ws
+
+    async def binance_stream(self, request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        try:
+            await self.replay(ws, 'binance_us')
+        finally:
+            await ws.close()
+        return ws
+
+    async def replay(self, ws, exchange):
+        sent = 0
+        while True:
+            for delay, data in self.frames.get(exchange, []):
+                if self.disconnect_after is not None and sent >= self.disconnect_after:
+                    return
+                await asyncio.sleep(delay / self.speed)
+                await ws.send_json(data)
+                sent += 1
+            if not self.repeat:
+                return
+
+    async def start(self):
+        self.runner = web.AppRunner(self.app())
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, self.host, self.port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+        self.logger.info("Replay server listening on {}".format(self.url))
+
+    async def stop(self):
+        if self.runner:
+            await self.runner.cleanup()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded exchange tickers")
+    parser.add_argument('recording')
+    parser.add_argument('--host', default="127.0.0.1")
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--speed', type=float, default=1.0)
+    parser.add_argument('--repeat', action='store_true')
+    parser.add_argument('--disconnect-after', type=int)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    server = ReplayServer.from_file(args.recording, host=args.host, port=args.port, speed=args.speed,
+                                    repeat=args.repeat, disconnect_after=args.disconnect_after)
+    loop = asyncio.get_event_loop()
+    loop.run_until_complete(server.start())
+    try:
+        loop.run_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        loop.run_until_complete(server.stop())
+
+
+if __name__ == '__main__':
+    main()
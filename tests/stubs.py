@@ -0,0 +1,28 @@
+import time
+
+from crypto_bot.exchanges import Exchange
+
+
+class StubExchange(Exchange):
+
+    def __init__(self, name, prices, priority=1, delay=0, overrides=None):
+        super().__init__({'priority': priority, 'coin_overrides': overrides})
+        self.name = name
+        self.prices = dict(prices)
+        self.delay = delay
+        self.calls = 0
+        for s in self.prices:
+            self.add_pair(s)
+        self.coins_ready()
+
+    async def get_coins(self):
+        for s in self.prices:
+            self.add_pair(s)
+
+    def parse_pair(self, pair):
+        return pair.lower()
+
+    def get_ticker_range(self, coins):
+        self.calls += 1
+        time.sleep(self.delay)
+        return {c.symbol: self.prices[c.symbol] for c in coins.values() if self.prices.get(c.symbol)}
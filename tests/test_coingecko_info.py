@@ -0,0 +1,68 @@
+import threading
+import time
+
+from crypto_bot.exchanges import CoinGeckoExchange
+from crypto_bot.price_indexer import Coin
+
+INFO = {
+    'name': 'Bitcoin',
+    'links': {'homepage': ['https://bitcoin.org'], 'repos_url': {'github': ['https://github.com/bitcoin/bitcoin']}},
+    'market_data': {'total_supply': 21000000, 'ath_date': {'usd': '2021-11-10T14:24:11.849Z'}},
+}
+
+
+def wait_for(condition, timeout=5):
+    end = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < end
+        time.sleep(0.01)
+
+
+def create_exchange(tmp_path):
+    exchange = CoinGeckoExchange({'priority': 1, 'icon_cache': {'path': str(tmp_path)}})
+    exchange.coins['btc'] = Coin('bitcoin', 'btc', 'Bitcoin', store=exchange.store)
+    exchange.requests = []
+    exchange.release = threading.Event()
+    exchange.release.set()
+
+    def call(url, **kwargs):
+        exchange.requests.append(url)
+        if 'markets' in url:
+            return []
+        exchange.release.wait()
+        return INFO
+
+    exchange.call = call
+    return exchange
+
+
+def test_market_fallback_joins_an_info_fetch_in_flight(tmp_path):
+    exchange = create_exchange(tmp_path)
+    exchange.get_coin_info('btc')
+    exchange.market_cache.clear()
+    exchange.requests.clear()
+    exchange.release.clear()
+
+    # an icon lookup is already fetching the full info when the market data turns out empty
+    fetch = threading.Thread(target=exchange.info_flight.do, args=('bitcoin', exchange.fetch_coin_info, 'bitcoin'))
+    fetch.start()
+    wait_for(lambda: exchange.requests)
+    lookup = threading.Thread(target=exchange.get_coin_info, args=('btc',))
+    lookup.start()
+    try:
+        wait_for(lambda: exchange.info_flight.coalesced == 1)
+    finally:
+        exchange.release.set()
+    fetch.join()
+    lookup.join()
+    assert len([u for u in exchange.requests if 'markets' not in u]) == 1
+
+
+def test_callers_get_their_own_copy(tmp_path):
+    exchange = create_exchange(tmp_path)
+    first = exchange.get_coin_info('btc')
+    first['repos'].append('mutated')
+    first['name'] = 'mutated'
+    second = exchange.get_coin_info('btc')
+    assert second['name'] == 'Bitcoin'
+    assert second['repos'] == ['https://github.com/bitcoin/bitcoin']
@@ -0,0 +1,71 @@
+import asyncio
+import json
+
+import pytest
+from aiohttp import web
+
+from crypto_bot import http_client
+from crypto_bot.exchanges import CoinGeckoExchange
+
+COINS = [{'id': 'bitcoin', 'symbol': 'btc', 'name': 'Bitcoin'}, {'id': 'ethereum', 'symbol': 'eth', 'name': 'Ether'}]
+
+
+def serve_list(bodies):
+    async def coin_list(request):
+        body = bodies.pop(0)
+        if request.headers.get('If-None-Match') == '"v1"':
+            return web.Response(status=304)
+        response = web.StreamResponse(headers={'ETag': '"v1"', 'Content-Type': 'application/json'})
+        await response.prepare(request)
+        await response.write(body.encode())
+        return response
+
+    app = web.Application()
+    app.router.add_get('/coins/list', coin_list)
+    return app
+
+
+def poll(tmp_path, bodies, check):
+    async def run():
+        runner = web.AppRunner(serve_list(bodies))
+        await runner.setup()
+        site = web.TCPSite(runner, '127.0.0.1', 0)
+        await site.start()
+        exchange = CoinGeckoExchange({'priority': 1, 'base_url': "http://127.0.0.1:{}".format(runner.addresses[0][1]),
+                                      'icon_cache': {'path': str(tmp_path)}})
+        try:
+            await check(exchange)
+        finally:
+            await http_client.close_all_async()
+            await runner.cleanup()
+
+    asyncio.run(run())
+
+
+def test_truncated_list_does_not_store_validators(tmp_path):
+    full = json.dumps(COINS)
+
+    async def check(exchange):
+        with pytest.raises(ValueError):
+            await exchange.get_coins()
+        assert exchange.list_etag is None
+        await exchange.get_coins()
+        assert exchange.list_etag == '"v1"'
+        assert set(exchange.coins) == {'btc', 'eth'}
+
+    poll(tmp_path, [full[:len(full) // 2], full], check)
+
+
+def test_unchanged_body_is_not_parsed(tmp_path):
+    full = json.dumps(COINS)
+
+    async def check(exchange):
+        await exchange.get_coins()
+        exchange.list_etag = None
+        parsed = []
+        exchange.parse_coin_list = lambda chunks: parsed.append(chunks)
+        await exchange.get_coins()
+        assert parsed == []
+        assert exchange.list_etag == '"v1"'
+
+    poll(tmp_path, [full, full], check)
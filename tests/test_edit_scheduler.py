@@ -0,0 +1,15 @@
+import pytest
+
+from crypto_bot.bots.edit_scheduler import EditScheduler
+
+
+def test_limits_override_known_routes():
+    scheduler = EditScheduler("test", {'nick': {'rate': 2}, 'global': {'rate': 10, 'burst': 10}})
+    assert scheduler.routes['nick']['rate'] == 2
+    assert scheduler.global_bucket.rate == 10
+    assert set(scheduler.routes) == {'nick', 'presence'}
+
+
+def test_unknown_limit_is_rejected():
+    with pytest.raises(ValueError):
+        EditScheduler("test", {'nickanme': {'rate': 2}})
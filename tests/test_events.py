@@ -0,0 +1,36 @@
+from crypto_bot.events import PriceBus
+
+
+def test_price_threshold_is_relative_to_the_last_published_price():
+    bus = PriceBus(price_threshold=0.01, perc_threshold=1)
+    assert bus.publish('btc', 100.0, 1.0) is not None
+    assert bus.publish('btc', 100.005, 1.0) is None
+    change = bus.publish('btc', 100.011, 1.0)
+    assert (change.old_price, change.new_price) == (100.0, 100.011)
+    assert (bus.published, bus.suppressed) == (2, 1)
+
+
+def test_perc_threshold_fires_without_a_price_move():
+    bus = PriceBus(price_threshold=1, perc_threshold=0.5)
+    bus.publish('btc', 100.0, 1.0)
+    assert bus.publish('btc', 100.0, 1.4) is None
+    assert bus.publish('btc', 100.0, 1.5) is not None
+    assert bus.publish('btc', 100.0, "N/A") is not None
+    assert bus.publish('btc', 100.0, "N/A") is None
+
+
+def test_changes_reach_only_subscribed_symbols():
+    bus = PriceBus()
+    btc, both = [], []
+    bus.subscribe({'BTC'}, btc.append)
+    sub = bus.subscribe({'btc', 'eth'}, both.append)
+    bus.publish('btc', 100.0, 1.0)
+    bus.publish('eth', 10.0, 1.0)
+    bus.publish('doge', 0.1, 1.0)
+    assert [c.symbol for c in btc] == ['btc']
+    assert [c.symbol for c in both] == ['btc', 'eth']
+
+    sub.cancel()
+    bus.publish('eth', 20.0, 1.0)
+    assert [c.symbol for c in both] == ['btc', 'eth']
+    assert 'eth' not in bus.subscriptions
@@ -0,0 +1,55 @@
+import asyncio
+
+import pytest
+
+from crypto_bot import http_client
+from crypto_bot.exchanges import BinanceUSExchange, KucoinExchange
+from tests.replay import ReplayServer
+
+
+def stream(exchange_cls, recording, config):
+    async def run():
+        server = ReplayServer(recording)
+        await server.start()
+        exchange = exchange_cls(dict({'priority': 1, 'stream': True, 'base_url': server.url}, **config(server)))
+        try:
+            await exchange.update_listing()
+            snapshot = {s: c.price for s, c in exchange.coins.items()}
+            with pytest.raises(ConnectionError):
+                await exchange.stream_tickers()
+            return snapshot, {s: (c.price, c.perc) for s, c in exchange.coins.items()}
+        finally:
+            await http_client.close_all_async()
+            await server.stop()
+
+    return asyncio.run(run())
+
+
+def test_binance_us_stream_applies_pushes_after_snapshot():
+    recording = [
+        {'type': 'snapshot', 'exchange': 'binance_us', 'data': [
+            {'symbol': 'BTCUSD', 'lastPrice': '100.0', 'priceChangePercent': '1.5'},
+            {'symbol': 'BTCUSDT', 'lastPrice': '99.0', 'priceChangePercent': '1.0'},
+        ]},
+        {'type': 'frame', 'exchange': 'binance_us', 'data': [{'s': 'BTCUSD', 'c': '101.0', 'P': '2.5'}]},
+        {'type': 'frame', 'exchange': 'binance_us', 'data': [{'s': 'ETHUSD', 'c': '10.0', 'P': '-1.0'}]},
+    ]
+    snapshot, streamed = stream(BinanceUSExchange, recording,
+                                lambda server: {'stream_url': server.ws_url + '/ws/!ticker@arr'})
+    assert snapshot == {'btc': 100.0}
+    assert streamed == {'btc': (101.0, 2.5), 'eth': (10.0, -1.0)}
+
+
+def test_kucoin_stream_connects_through_bullet_token(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    recording = [
+        {'type': 'snapshot', 'exchange': 'kucoin', 'data': {'data': {'ticker': [
+            {'symbol': 'BTC-USDT', 'last': '100.0', 'changeRate': '0.01'},
+        ]}}},
+        {'type': 'frame', 'exchange': 'kucoin', 'data': {
+            'type': 'message', 'data': {'data': {'symbol': 'BTC-USDT', 'lastTradedPrice': '102.0',
+                                                 'changeRate': '0.02'}}}},
+    ]
+    snapshot, streamed = stream(KucoinExchange, recording, lambda server: {})
+    assert snapshot == {'btc': 100.0}
+    assert streamed == {'btc': (102.0, 0.02)}
@@ -0,0 +1,62 @@
+import asyncio
+
+from crypto_bot.bots.fanout import FanOut
+
+
+class FakeChannel:
+
+    def __init__(self, id, delays=None, tracker=None, fail=()):
+        self.id = id
+        self.delays = list(delays or [])
+        self.tracker = tracker
+        self.fail = set(fail)
+        self.sent = []
+
+    async def send(self, msg):
+        if self.tracker is not None:
+            self.tracker['active'] += 1
+            self.tracker['peak'] = max(self.tracker['peak'], self.tracker['active'])
+        try:
+            await asyncio.sleep(self.delays.pop(0) if self.delays else 0.02)
+            if msg in self.fail:
+                raise RuntimeError("send failed")
+            self.sent.append(msg)
+        finally:
+            if self.tracker is not None:
+                self.tracker['active'] -= 1
+
+
+def test_sends_to_one_channel_keep_submission_order():
+    channel = FakeChannel(1, delays=[0.05, 0.01, 0.03, 0.0])
+    fanout = FanOut("test")
+
+    async def run():
+        await asyncio.gather(*(fanout.relay(m, [channel]) for m in ("a", "b", "c", "d")))
+
+    asyncio.run(run())
+    assert channel.sent == ["a", "b", "c", "d"]
+    assert fanout.tails == {}
+
+
+def test_channels_run_in_parallel_up_to_the_limit():
+    tracker = {'active': 0, 'peak': 0}
+    channels = [FakeChannel(i, tracker=tracker) for i in range(6)]
+    fanout = FanOut("test", concurrency=3)
+
+    results = asyncio.run(fanout.relay("hello", channels))
+    assert results == [None] * 6
+    assert tracker['peak'] == 3
+    assert all(c.sent == ["hello"] for c in channels)
+
+
+def test_failed_send_does_not_stall_the_channel():
+    channel = FakeChannel(1, fail={"a"})
+    fanout = FanOut("test")
+
+    async def run():
+        return await asyncio.gather(fanout.relay("a", [channel]), fanout.relay("b", [channel]))
+
+    first, second = asyncio.run(run())
+    assert isinstance(first[0], RuntimeError)
+    assert second == [None]
+    assert channel.sent == ["b"]
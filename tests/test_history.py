@@ -0,0 +1,57 @@
+import pytest
+
+from crypto_bot.history import HistoryStore, PriceHistory, RingBuffer, parse_window
+
+
+def test_parse_window_units():
+    assert parse_window("90") == 90
+    assert parse_window("30m") == 1800
+    assert parse_window("1.5h") == 5400
+    assert parse_window(" 7D ") == 7 * 86400
+    assert parse_window("2w") == 2 * 604800
+
+
+@pytest.mark.parametrize('window', ["0", "0m", "", "5y", "-1h", "h", "1hm"])
+def test_parse_window_rejects_bad_input(window):
+    with pytest.raises(ValueError):
+        parse_window(window)
+
+
+def test_ring_buffer_overwrites_the_same_bucket():
+    buf = RingBuffer(60, 4)
+    buf.add(120, 1.0)
+    buf.add(150, 2.0)
+    buf.add(180, 3.0)
+    ts, price = buf.ordered()
+    assert ts.tolist() == [120, 180]
+    assert price.tolist() == [2.0, 3.0]
+
+
+def test_ring_buffer_wraps_around_in_order():
+    buf = RingBuffer(1, 3)
+    for t in range(5):
+        buf.add(t, float(t))
+    ts, price = buf.ordered()
+    assert buf.count == 3
+    assert ts.tolist() == [2, 3, 4]
+    assert price.tolist() == [2.0, 3.0, 4.0]
+    assert buf.window(3, 4)[1].tolist() == [3.0, 4.0]
+
+
+def test_tier_for_picks_the_finest_tier_covering_the_window():
+    history = PriceHistory([{'resolution': 1, 'capacity': 60}, {'resolution': 60, 'capacity': 60}])
+    assert history.tier_for(30).resolution == 1
+    assert history.tier_for(60).resolution == 1
+    assert history.tier_for(61).resolution == 60
+    assert history.tier_for(10 ** 6).resolution == 60
+
+
+def test_store_stats_over_a_window():
+    store = HistoryStore([{'resolution': 1, 'capacity': 100}])
+    for t, p in ((10, 2.0), (11, 4.0), (12, 1.0), (13, 3.0)):
+        store.record('abc', p, t)
+    store.record('abc', 0, 14)
+    stats = store.stats('ABC', 2, now=13)
+    assert (stats['first'], stats['last'], stats['min'], stats['max'], stats['samples']) == (4.0, 3.0, 1.0, 4.0, 3)
+    assert stats['change_perc'] == -25.0
+    assert store.stats('xyz', 3, now=13) is None
@@ -0,0 +1,35 @@
+import asyncio
+
+import pytest
+from aiohttp import web
+
+from crypto_bot.http_client import HttpClient, HttpStatusError, REQUEST_ERRORS, REQUEST_SECONDS
+
+
+async def serve():
+    app = web.Application()
+    app.router.add_get('/ok', lambda request: web.json_response([1, 2, 3]))
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    return runner, "http://127.0.0.1:{}".format(runner.addresses[0][1])
+
+
+def test_open_async_is_measured():
+    async def run():
+        runner, url = await serve()
+        client = HttpClient("open-async-test")
+        try:
+            async with client.open_async(url + "/ok") as r:
+                assert await r.json() == [1, 2, 3]
+            with pytest.raises(HttpStatusError):
+                async with client.open_async(url + "/missing"):
+                    pass
+        finally:
+            await client.close_async()
+            await runner.cleanup()
+
+    asyncio.run(run())
+    assert REQUEST_SECONDS.values[("open-async-test",)][2] == 2
+    assert REQUEST_ERRORS.values[("open-async-test",)] == 1
@@ -0,0 +1,17 @@
+import os
+
+from crypto_bot.icon_cache import IconCache
+
+
+def test_relative_path_resolves_against_config_dir(tmp_path):
+    assert IconCache.from_config(None, str(tmp_path)).path == os.path.join(str(tmp_path), "cache/icons")
+    assert IconCache.from_config({'path': "/tmp/icons"}, str(tmp_path)).path == "/tmp/icons"
+
+
+def test_directory_is_created_on_first_put(tmp_path):
+    cache = IconCache.from_config({'path': "icons"}, str(tmp_path))
+    assert not os.path.exists(cache.path)
+    assert cache.get('bitcoin') is None
+    digest = cache.put('bitcoin', b"png")
+    assert os.path.exists(cache.blob_path(digest))
+    assert IconCache(cache.path).get('bitcoin') == b"png"
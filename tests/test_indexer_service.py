@@ -0,0 +1,56 @@
+import os
+
+from crypto_bot.icon_cache import IconCache
+from crypto_bot.indexer_service import IndexerClient, serve_indexer
+from crypto_bot.price_indexer import PriceIndexer
+from crypto_bot.shared_prices import SharedPriceTable
+from tests.stubs import StubExchange
+
+
+def test_client_reads_quotes_from_shared_table(tmp_path):
+    exchange = StubExchange("CoinGecko", {'abc': (1.5, -2.0)})
+    exchange.icon_cache = IconCache(str(tmp_path))
+    indexer = PriceIndexer([exchange], 1, snapshot={'enabled': False})
+    table = SharedPriceTable.create("crypto_bot_test_{}".format(os.getpid()), 16)
+    server = serve_indexer(indexer, ('127.0.0.1', 0), b"secret")
+    try:
+        indexer.get_coin('abc', wait=True)
+        indexer.share_prices(SharedPriceTable.attach(table.name, writer=True))
+        indexer.running = True
+        client = IndexerClient(server.address, b"secret", SharedPriceTable.attach(table.name))
+        q = client.get_quote('ABC')
+        assert (q.price, q.perc, q.exchange) == (1.5, -2.0, "CoinGecko")
+        assert client.get_quote('xyz') is None
+
+        assert client.icon_cache.avatar_changed(1, b"icon")
+        client.icon_cache.set_avatar(1, b"icon")
+        assert not client.icon_cache.avatar_changed(1, b"icon")
+        assert not indexer.icon_cache.avatar_changed(1, b"icon")
+    finally:
+        indexer.stop()
+        table.unlink()
+
+
+def test_symbols_the_table_cannot_hold_fall_back_to_the_service():
+    exchange = StubExchange("Stub", {'abc': (1.5, -2.0), 'longcoin': (3.0, 1.0)})
+    indexer = PriceIndexer([exchange], 1, snapshot={'enabled': False})
+    table = SharedPriceTable.create("crypto_bot_test_fallback_{}".format(os.getpid()), 16, symbol_size=4)
+    server = serve_indexer(indexer, ('127.0.0.1', 0), b"secret")
+    try:
+        indexer.share_prices(SharedPriceTable.attach(table.name, writer=True))
+        indexer.get_coin('abc', wait=True)
+        indexer.get_coin('longcoin', wait=True)
+        client = IndexerClient(server.address, b"secret", SharedPriceTable.attach(table.name))
+        assert client.get_quote('abc').price == 1.5
+        assert client.get_quote('LONGCOIN').price == 3.0
+        assert 'abc' not in client.remote
+
+        changes = []
+        client.bus.subscribe({'longcoin'}, changes.append)
+        exchange.prices['longcoin'] = (4.0, 1.0)
+        indexer.update_coins(wait=True)
+        client.sync()
+        assert [c.new_price for c in changes] == [4.0]
+    finally:
+        indexer.stop()
+        table.unlink()
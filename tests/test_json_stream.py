@@ -0,0 +1,38 @@
+import json
+
+import pytest
+
+from crypto_bot.json_stream import iter_json_array
+
+DOCUMENTS = [
+    '[2.5]',
+    '[{"a":0},1,2.5]',
+    '[1e5, -1, 0.25E-3, -12.75]',
+    '[true, false, null, "x,]y", [1, [2.5]], {"b": [3, 4.5]}]',
+    ' [ 10 , 20 , 30 ] ',
+    '[]',
+]
+
+
+def chunked(text, size):
+    data = text.encode()
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+@pytest.mark.parametrize('doc', DOCUMENTS)
+def test_chunk_size_sweep(doc):
+    expected = json.loads(doc)
+    for size in range(1, len(doc) + 1):
+        assert list(iter_json_array(chunked(doc, size))) == expected, size
+
+
+def test_chunk_size_sweep_with_key():
+    doc = '{"code": "200", "data": {"ticker": [{"symbol": "BTC-USDT", "last": 2.5}, 1.25, -3e2]}}'
+    expected = json.loads(doc)['data']['ticker']
+    for size in range(1, len(doc) + 1):
+        assert list(iter_json_array(chunked(doc, size), key='ticker')) == expected, size
+
+
+def test_unterminated_array_raises():
+    with pytest.raises(ValueError):
+        list(iter_json_array([b'[1, 2']))
@@ -0,0 +1,22 @@
+from crypto_bot.exchanges import ListingLog
+
+
+def test_since_returns_new_listings():
+    log = ListingLog()
+    cursor = log.append('abc')
+    log.append('xyz')
+    generation, entries, missed = log.since(cursor)
+    assert generation == 2
+    assert [s for _, s, _ in entries] == ['xyz']
+    assert missed == 0
+
+
+def test_since_reports_listings_lost_to_overflow():
+    log = ListingLog(max_size=3)
+    for s in 'abcdef':
+        log.append(s)
+    generation, entries, missed = log.since(1)
+    assert generation == 6
+    assert [s for _, s, _ in entries] == ['d', 'e', 'f']
+    assert missed == 2
+    assert log.since(generation)[1:] == ([], 0)
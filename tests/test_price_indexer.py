@@ -0,0 +1,83 @@
+import time
+
+from crypto_bot import metrics
+from crypto_bot.bots.bot_globals import format_price
+from crypto_bot.price_indexer import PriceIndexer
+from tests.stubs import StubExchange
+
+
+def create_indexer(*exchanges):
+    return PriceIndexer(list(exchanges), 1, snapshot={'enabled': False})
+
+
+def test_first_lookup_without_price_is_not_priced():
+    indexer = create_indexer(StubExchange("Stub", {'abc': None, 'xyz': (2.5, 1.0)}))
+    try:
+        c = indexer.get_coin('ABC', wait=True)
+        assert indexer.get_quote('abc') is None
+        assert format_price('abc', c, indexer.get_quote('abc')) == "ABC/abc: N/A - not yet priced"
+    finally:
+        indexer.stop()
+
+
+def test_first_lookup_with_price():
+    indexer = create_indexer(StubExchange("Stub", {'xyz': (2.5, 1.0)}))
+    try:
+        c = indexer.get_coin('xyz', wait=True)
+        q = indexer.get_quote('xyz')
+        assert (q.price, q.perc, q.exchange) == (2.5, 1.0, "Stub")
+        assert format_price('xyz', c, q) == "XYZ/xyz: $2.5, change: 1.0% - indexed from Stub"
+    finally:
+        indexer.stop()
+
+
+def test_run_now_joins_a_queued_run():
+    exchange = StubExchange("Slow", {'abc': (1.0, 0.0), 'xyz': (2.0, 0.0)}, delay=0.2)
+    indexer = create_indexer(exchange)
+    worker = indexer.workers["Slow"]
+    try:
+        indexer.add_new_coin('abc')
+        indexer.add_new_coin('xyz')
+        worker.enqueue({'abc'}, time.monotonic() + 5)
+        assert worker.submit({'abc'}, time.monotonic() + 5) is False
+        assert worker.run_now({'xyz'}, 5)
+        assert indexer.get_quote('xyz').price == 2.0
+    finally:
+        indexer.stop()
+
+
+def test_waited_update_shares_one_deadline_across_workers():
+    exchanges = [StubExchange("Slow{}".format(i), {'c{}'.format(i): (1.0, 0.0)}, priority=i, delay=0.3)
+                 for i in range(3)]
+    indexer = create_indexer(*exchanges)
+    try:
+        for i in range(3):
+            indexer.add_new_coin('c{}'.format(i))
+        start = time.monotonic()
+        indexer.update_coins(wait=True)
+        assert time.monotonic() - start < 0.6
+        assert all(indexer.get_quote('c{}'.format(i)) for i in range(3))
+    finally:
+        indexer.stop()
+
+
+def test_run_picked_up_after_its_deadline_is_dropped_once():
+    exchange = StubExchange("Late", {'abc': (1.0, 0.0)})
+    indexer = create_indexer(exchange)
+    worker = indexer.workers["Late"]
+    try:
+        indexer.add_new_coin('abc')
+        run = worker.enqueue({'abc'}, time.monotonic() - 1)
+        assert worker.join(run, time.monotonic() + 5) is False
+        assert (worker.skipped, worker.missed_deadlines, exchange.calls) == (1, 0, 0)
+    finally:
+        indexer.stop()
+
+
+def test_metrics_collector_is_removed_on_stop():
+    indexer = create_indexer(StubExchange("Stub", {'abc': (1.0, 0.0)}))
+    assert indexer.collect_metrics not in metrics.REGISTRY.collectors
+    indexer.run()
+    assert indexer.collect_metrics in metrics.REGISTRY.collectors
+    indexer.stop()
+    assert indexer.collect_metrics not in metrics.REGISTRY.collectors
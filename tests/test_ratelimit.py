@@ -0,0 +1,23 @@
+import asyncio
+
+import pytest
+
+from crypto_bot.error import RateLimitedException
+from crypto_bot.ratelimit import RequestScheduler
+
+
+def test_acquire_never_blocks_the_event_loop():
+    scheduler = RequestScheduler("test", rate=1, burst=1, lanes=("a",))
+    scheduler.bucket.pause(60)
+
+    async def call():
+        scheduler.call("a", lambda: None)
+
+    with pytest.raises(RateLimitedException):
+        asyncio.run(asyncio.wait_for(call(), 1))
+
+
+def test_acquire_waits_off_the_event_loop():
+    scheduler = RequestScheduler("test", rate=20, burst=1, lanes=("a",))
+    assert scheduler.call("a", lambda: 1) == 1
+    assert scheduler.call("a", lambda: 2) == 2
@@ -0,0 +1,49 @@
+import asyncio
+import os
+
+from crypto_bot.price_indexer import PriceIndexer
+from crypto_bot.snapshot import Snapshot
+from tests.stubs import StubExchange
+
+
+def save_and_restore(tmp_path, prices, overrides=None, restored_overrides=None):
+    config = {'path': str(tmp_path / "snapshot.npz")}
+    old = PriceIndexer([StubExchange("Stub", prices, overrides=overrides)], 1, snapshot=config)
+    old.get_coin('abc', wait=True)
+    old.stop()
+
+    exchange = StubExchange("Stub", {}, overrides=restored_overrides)
+    exchange.ready = False
+    indexer = PriceIndexer([exchange], 1, snapshot=config)
+    return indexer, exchange, indexer.load_snapshot()
+
+
+def test_snapshot_is_opt_in():
+    assert not Snapshot.from_config(None).enabled
+    assert Snapshot.from_config({'interval': 60}).enabled
+
+
+def test_relative_path_resolves_against_config_dir():
+    assert Snapshot.from_config({'path': "cache/s.npz"}, "/etc/bot").path == os.path.join("/etc/bot", "cache/s.npz")
+    assert Snapshot.from_config({'path': "/tmp/s.npz"}, "/etc/bot").path == "/tmp/s.npz"
+
+
+def test_restore_does_not_announce_downtime_listings(tmp_path):
+    indexer, exchange, restored = save_and_restore(tmp_path, {'abc': (1.0, 0.5)})
+    assert restored
+    assert indexer.get_quote('abc').price == 1.0
+    cursors = indexer.listing_cursors()
+
+    exchange.prices['listed_while_down'] = (2.0, 0.0)
+    asyncio.run(exchange.update_listing())
+    assert indexer.new_coins_since(cursors) == {}
+
+    exchange.prices['listed_now'] = (3.0, 0.0)
+    asyncio.run(exchange.update_listing())
+    assert indexer.new_coins_since(cursors) == {'Stub': ['listed_now']}
+
+
+def test_changed_overrides_invalidate_the_snapshot(tmp_path):
+    _, exchange, _ = save_and_restore(tmp_path, {'abc': (1.0, 0.5)}, {'abc': 'abc-1'}, {'abc': 'abc-2'})
+    assert not exchange.ready
+    assert 'abc' not in exchange.coins
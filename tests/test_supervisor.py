@@ -0,0 +1,59 @@
+import time
+
+from crypto_bot.supervisor import Supervisor
+
+
+class FakeProcess:
+
+    def __init__(self, name, alive=True):
+        self.name = name
+        self.pid = 1
+        self.alive = alive
+        self.exitcode = None if alive else 1
+
+    def is_alive(self):
+        return self.alive
+
+
+def create_supervisor(**supervisor):
+    config = {'process': {'supervisor': dict({'price_table': {'capacity': 16}}, **supervisor)},
+              'discord': {'price_bots': {'s': {'instances': {'token': 'btc'}}}}}
+    sup = Supervisor("config.yaml", config, 1)
+    sup.spawn = lambda name: None
+    return sup
+
+
+def test_restart_backoff_resets_after_a_stable_period():
+    sup = create_supervisor(stable_after=60)
+    try:
+        now = time.time()
+        sup.processes = {'indexer': FakeProcess('indexer'), 0: FakeProcess('worker 0', alive=False)}
+        sup.started = {'indexer': now, 0: now}
+        sup.restarts = {0: 3}
+        sup.check()
+        assert sup.restarts[0] == 4
+
+        sup.processes[0] = FakeProcess('worker 0')
+        sup.restart_at.clear()
+        sup.status[0] = {'time': now}
+        sup.started[0] = now - 61
+        sup.check()
+        assert sup.restarts[0] == 0
+    finally:
+        sup.table.unlink()
+
+
+def test_indexer_without_heartbeats_is_terminated():
+    sup = create_supervisor(heartbeat_timeout=10)
+    terminated = []
+    try:
+        indexer = FakeProcess('indexer')
+        indexer.terminate = lambda: terminated.append('indexer')
+        indexer.join = lambda timeout: None
+        sup.processes = {'indexer': indexer, 0: FakeProcess('worker 0')}
+        sup.started = {'indexer': time.time() - 700, 0: time.time()}
+        sup.status = {'indexer': {'time': time.time() - 11, 'coins': 1, 'stale': 3.0}}
+        sup.check()
+        assert terminated == ['indexer']
+    finally:
+        sup.table.unlink()
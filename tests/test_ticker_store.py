@@ -0,0 +1,11 @@
+from crypto_bot.price_indexer import Coin, DETACHED_STORE
+
+
+def test_coins_without_a_store_share_a_detached_store():
+    a = Coin("bitcoin", "btc")
+    b = Coin("bitcoin-2", "btc")
+    assert a.store is b.store is DETACHED_STORE
+    assert a.row != b.row
+    a.update(1.5, 2.0, "KuCoin")
+    assert (a.price, a.perc, a.last_exchange) == (1.5, 2.0, "KuCoin")
+    assert not b.timestamp